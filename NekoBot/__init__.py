@@ -1,2 +1,52 @@
-from .client import BaseClass, NekoBot
-from .async_client import NekoBotAsync
+from .base import BaseClass, BatchResult, Call, Response
+from .cache import BaseCache, ResultCache, TieredCache
+from .asset_cache import AssetCache
+from .disk_cache import DiskCache
+from .shared_cache import SharedCache
+from .ratelimit import RateLimiter
+from .retry import CircuitBreaker, RetryPolicy
+from .errors import NekoBotError, APIError, CircuitOpenError, DecodeError, DeadlineExceeded
+from .transport import AsyncTransport, Transport, TransportConfig
+from .metrics import Metrics
+from .keys import KeyPool
+from .hosts import HostPool
+from .scheduler import PriorityScheduler
+from .result import BaseImageResult, ImageResult, MappedImageResult
+import importlib
+import typing
+
+if typing.TYPE_CHECKING:
+    from .client import NekoBot, RequestsTransport
+    from .async_client import AiohttpTransport, NekoBotAsync
+    from .pool import NekoBotPool
+    from .bridge import NekoBotBridge
+
+# Clients pull in requests or aiohttp, they are only imported once used
+_LAZY = {
+    "NekoBot": ".client",
+    "RequestsTransport": ".client",
+    "NekoBotAsync": ".async_client",
+    "AiohttpTransport": ".async_client",
+    "NekoBotPool": ".pool",
+    "NekoBotBridge": ".bridge"
+}
+
+__all__ = [
+    "BaseClass", "BatchResult", "Call", "Response", "BaseCache", "ResultCache", "TieredCache", "AssetCache",
+    "DiskCache", "SharedCache", "RateLimiter", "CircuitBreaker", "RetryPolicy", "NekoBotError", "APIError",
+    "CircuitOpenError", "DecodeError", "DeadlineExceeded", "AsyncTransport", "Transport", "TransportConfig", "Metrics",
+    "KeyPool", "HostPool", "PriorityScheduler", "BaseImageResult", "ImageResult", "MappedImageResult", *_LAZY
+]
+
+
+def __getattr__(name: str) -> typing.Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,184 @@
+from .result import ImageResult
+import collections
+import email.utils
+import threading
+import time
+import typing
+
+
+def _http_date(value: typing.Optional[str]) -> typing.Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_cache_control(value: typing.Optional[str]) -> typing.Dict[str, typing.Optional[str]]:
+    """
+    :param value: Cache-Control header
+    :return: Directives by lowercase name, values without quotes or None
+    """
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def freshness_lifetime(headers: typing.Mapping[str, str], default: float = 0.0) -> typing.Optional[float]:
+    """
+    Seconds a response stays fresh from when it was received
+    :param headers: Response headers
+    :param default: Lifetime when the response has no Cache-Control max-age or Expires
+    :return: Seconds, or None if the response may not be stored
+    """
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    try:
+        lifetime = float(directives["max-age"])
+    except (KeyError, TypeError, ValueError):
+        expires = _http_date(headers.get("Expires"))
+        if expires is None:
+            lifetime = 0.0 if "Expires" in headers else default
+        else:
+            lifetime = expires - (_http_date(headers.get("Date")) or time.time())
+    try:
+        age = float(headers.get("Age", 0))
+    except ValueError:
+        age = 0.0
+    return max(0.0, lifetime - age)
+
+
+class _Asset:
+    __slots__ = ("result", "etag", "last_modified", "expires")
+
+    def __init__(self, result: ImageResult, etag: typing.Optional[str], last_modified: typing.Optional[str],
+                 expires: float):
+        self.result = result
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+
+class AssetCache:
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, *, default_ttl: float = 0.0):
+        """
+        HTTP cache for image URLs downloaded with fetch(), follows Cache-Control and Expires and revalidates stale
+        assets with If-None-Match/If-Modified-Since so unchanged ones come back as a 304 without a body.
+        One instance can be shared between clients.
+        :param max_bytes: Max total size of cached assets, least recently used ones are evicted first
+        :param default_ttl: Seconds assets without Cache-Control max-age or Expires are fresh for, stale assets are
+            still kept while they have a validator
+        """
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._bytes = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, url: str) -> typing.Optional[ImageResult]:
+        """
+        :param url: Asset URL
+        :return: The cached asset if it is still fresh
+        """
+        with self._lock:
+            asset = self._data.get(url)
+            if asset is None or asset.expires <= time.monotonic():
+                self.misses += 1
+                return None
+            self._data.move_to_end(url)
+            self.hits += 1
+            return asset.result
+
+    def validators(self, url: str) -> typing.Dict[str, str]:
+        """
+        :param url: Asset URL
+        :return: Conditional request headers for a stale cached asset, empty if there is none
+        """
+        with self._lock:
+            asset = self._data.get(url)
+            if asset is None:
+                return {}
+            headers = {}
+            if asset.etag is not None:
+                headers["If-None-Match"] = asset.etag
+            if asset.last_modified is not None:
+                headers["If-Modified-Since"] = asset.last_modified
+            return headers
+
+    def put(self, url: str, result: ImageResult):
+        """
+        Store a downloaded asset if its headers allow it
+        :param url: Asset URL
+        :param result: Asset with status 200 and its response headers
+        """
+        lifetime = freshness_lifetime(result.headers, self.default_ttl)
+        etag = result.headers.get("ETag")
+        last_modified = result.headers.get("Last-Modified")
+        size = len(result)
+        if result.status != 200 or lifetime is None or size > self.max_bytes or \
+                not lifetime and etag is None and last_modified is None:
+            return
+        with self._lock:
+            self._remove(url)
+            self._data[url] = _Asset(result, etag, last_modified, time.monotonic() + lifetime)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+
+    def revalidate(self, url: str, headers: typing.Mapping[str, str]) -> typing.Optional[ImageResult]:
+        """
+        Refresh a cached asset after the server answered 304 Not Modified
+        :param url: Asset URL
+        :param headers: Headers of the 304 response
+        :return: The cached asset, None if it was evicted in the meantime
+        """
+        lifetime = freshness_lifetime(headers, self.default_ttl)
+        with self._lock:
+            asset = self._data.get(url)
+            if asset is None:
+                return None
+            if lifetime is None:
+                self._remove(url)
+            else:
+                asset.expires = time.monotonic() + lifetime
+                asset.etag = headers.get("ETag", asset.etag)
+                self._data.move_to_end(url)
+            self.revalidated += 1
+            return asset.result
+
+    def _remove(self, url: str):
+        asset = self._data.pop(url, None)
+        if asset is not None:
+            self._bytes -= len(asset.result)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.revalidated = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "size": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes
+        }
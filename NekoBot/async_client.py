@@ -1,339 +1,593 @@
-from .client import BaseClass, Response
+from .asset_cache import AssetCache
+from .base import BaseClass, BatchResult, Call, Response, DEFAULT_CHUNK_SIZE, decode_response, open_sink
+from .endpoints import Endpoint, endpoint_params, endpoints
+from .errors import APIError, DeadlineExceeded, DecodeError
+from .hosts import HostPool
+from .keys import KeyPool
+from .metrics import Metrics
+from .prefetch import AsyncImagePrefetcher
+from .result import BaseImageResult, ImageResult
+from .transport import AsyncTransport, AsyncTransportResponse, TransportConfig
+from .cache import BaseCache, endpoint_name, make_key
+from .ratelimit import RateLimiter
+from .scheduler import PriorityScheduler
+from .retry import CircuitBreaker, RetryPolicy
 import asyncio
 import aiohttp
+import functools
+import inspect
+import os
+import time
 import typing
+import warnings
 
 
+class _InFlight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class AiohttpResponse(AsyncTransportResponse):
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+    async def iter_chunks(self, chunk_size: int) -> typing.AsyncIterator[bytes]:
+        async for chunk in self._response.content.iter_chunked(chunk_size):
+            yield chunk
+
+    def release(self):
+        self._response.release()
+
+
+class _Scheduled(AsyncTransportResponse):
+    """
+    Response holding a scheduler slot, the slot is handed back once the response is released
+    """
+
+    def __init__(self, response: AsyncTransportResponse, scheduler: PriorityScheduler):
+        self._response = response
+        self._scheduler = scheduler
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+    def iter_chunks(self, chunk_size: int) -> typing.AsyncIterator[bytes]:
+        return self._response.iter_chunks(chunk_size)
+
+    def release(self):
+        self._response.release()
+        if self._scheduler is not None:
+            self._scheduler.release()
+            self._scheduler = None
+
+
+class AiohttpTransport(AsyncTransport):
+    errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+    def __init__(self, config: TransportConfig = None, *, session: aiohttp.ClientSession = None,
+                 connector: aiohttp.BaseConnector = None, loop: asyncio.AbstractEventLoop = None):
+        """
+        Default transport for NekoBotAsync, an aiohttp.ClientSession with a TCPConnector set up from config. The
+        session is created on the first request so this can be built outside of a running event loop.
+        :param config: Connection pool and timeout settings, only used for the session and connector created here
+        :param session: Session to send requests with, it can be shared by many clients and isn't closed by close()
+        :param connector: Connector for the created session, it can be shared by many clients and isn't closed by
+            close()
+        :param loop: Deprecated, the session uses the running loop
+        """
+        if loop is not None:
+            warnings.warn("loop is deprecated, the session is created on the running loop", DeprecationWarning, 2)
+        self.config = config or TransportConfig()
+        self.connector = connector
+        self._session = session
+        self._owns_session = session is None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            config = self.config
+            connector = self.connector
+            if connector is None:
+                connector = aiohttp.TCPConnector(
+                    limit=config.pool_size if config.pool_size is not None else 100,
+                    limit_per_host=config.max_per_host if config.max_per_host is not None else 0,
+                    keepalive_timeout=config.keepalive_timeout,
+                    ttl_dns_cache=config.dns_cache_ttl
+                )
+            default = aiohttp.client.DEFAULT_TIMEOUT
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                connector_owner=self.connector is None,
+                timeout=aiohttp.ClientTimeout(
+                    total=default.total,
+                    connect=default.connect,
+                    sock_connect=config.connect_timeout if config.connect_timeout is not None else default.sock_connect,
+                    sock_read=config.read_timeout if config.read_timeout is not None else default.sock_read
+                )
+            )
+        return self._session
+
+    async def get(self, url: str, params: dict, headers: dict) -> AiohttpResponse:
+        return AiohttpResponse(await self.session.get(url, params=params, headers=headers))
+
+    async def close(self):
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+@endpoints
 class NekoBotAsync(BaseClass):
 
-    def __init__(self, authorization: str = "", *, loop: asyncio.AbstractEventLoop = None):
-        super().__init__(authorization)
-        if loop is None:
-            loop = asyncio.get_event_loop()
-        self._http = aiohttp.ClientSession(
-            loop=loop,
-            headers={
-                "User-Agent": self.user_agent,
-                "Authorization": self.authorization
-            }
-        )
+    def __init__(self, authorization: str = "", *, loop: asyncio.AbstractEventLoop = None,
+                 session: aiohttp.ClientSession = None, connector: aiohttp.BaseConnector = None,
+                 cache: BaseCache = None, rate_limiter: RateLimiter = None, retry: RetryPolicy = None,
+                 circuit_breaker: CircuitBreaker = None, transport_config: TransportConfig = None,
+                 transport: AsyncTransport = None, metrics: Metrics = None, keys: KeyPool = None,
+                 hosts: HostPool = None, resolve_via: str = "auto", asset_cache: AssetCache = None,
+                 deadline: float = None, deadlines: typing.Dict[str, float] = None, hedge: float = None,
+                 scheduler: PriorityScheduler = None,
+                 coalesce: typing.Iterable[str] = ("/imagegen",)):
+        """
+        :param authorization: API token
+        :param loop: Deprecated, the session is created on the running loop when the first request is sent
+        :param session: aiohttp session to share with other clients, it is left open by close()
+        :param connector: aiohttp connector to share with other clients, it is left open by close()
+        :param cache: Optional result cache
+        :param rate_limiter: Optional rate limiter, can be shared with other clients
+        :param retry: Optional retry policy for connection errors and 5xx responses
+        :param circuit_breaker: Optional circuit breaker, can be shared with other clients
+        :param transport_config: Connection pool and timeout settings
+        :param transport: Transport to send requests with, defaults to an AiohttpTransport using transport_config,
+            session and connector
+        :param metrics: Optional metrics collector, can be shared with other clients
+        :param keys: Optional pool of API tokens to spread requests over instead of authorization
+        :param hosts: Optional pool of base URLs to route requests over instead of BASE_URL
+        :param resolve_via: How endpoints called with resolve=True get the image, auto, raw or url
+        :param asset_cache: Optional HTTP cache for image URLs downloaded with fetch(), can be shared with other
+            clients
+        :param deadline: Default seconds a call may take including retries, None waits forever
+        :param deadlines: Deadline overrides by endpoint name, imagegen type or path
+        :param hedge: Latency quantile, e.g. 0.95, after which a duplicate of a slow request is sent and whichever
+            succeeds first is used, the other one is cancelled. Latencies are tracked with metrics, a Metrics is
+            created if none is given
+        :param scheduler: Optional scheduler limiting requests in flight and ordering them by the priority calls
+            are made with, can be shared with other clients on the same event loop
+        :param coalesce: Paths or imagegen types whose identical concurrent requests share one HTTP request,
+            /image is left out as every call should return a different random image
+        """
+        super().__init__(authorization, cache=cache, rate_limiter=rate_limiter, retry=retry,
+                         circuit_breaker=circuit_breaker, transport_config=transport_config, metrics=metrics,
+                         keys=keys, hosts=hosts,
+                         resolve_via=resolve_via, asset_cache=asset_cache, deadline=deadline, deadlines=deadlines)
+        if hedge is not None and self.metrics is None:
+            self.metrics = Metrics()
+        self.hedge = hedge
+        self.scheduler = scheduler
+        self.coalesce = frozenset(coalesce)
+        self._inflight = {}
+        if loop is not None:
+            warnings.warn("loop is deprecated, the session is created on the running loop", DeprecationWarning, 2)
+        self._http = transport or AiohttpTransport(self.transport_config, session=session, connector=connector)
+
+    async def __aenter__(self) -> "NekoBotAsync":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
 
     async def close(self):
+        if self._prefetcher is not None:
+            await self._prefetcher.close()
         await self._http.close()
 
-    async def _request(self, path: str, params: dict) -> typing.Union[Response, bytes]:
-        async with self._http.get(self.BASE_URL + path, params=params) as r:
-            try:
-                data = Response(**(await r.json()))
-            except:
-                data = await r.read()
-        return data
+    def prefetch(self, *image_types: str, low: int = 2, high: int = 8):
+        """
+        Fetch get_image results ahead of time in background tasks, get_image then returns from the queue
+        while it has images
+        :param image_types: Image types to prefetch
+        :param low: Refill once a queue has this many images or less
+        :param high: Max images kept per type
+        """
+        if self._prefetcher is None:
+            self._prefetcher = AsyncImagePrefetcher(self, low, high)
+        for image_type in image_types:
+            self._prefetcher.start(image_type)
 
-    async def get_image(self, image_type: str) -> Response:
+    async def iter_images(self, image_type: str) -> typing.AsyncIterator[Response]:
         """
-        Get an image from the api
+        Endless async iterator of images of one type served from the prefetch queue
         :param image_type: https://docs.nekobot.xyz/#image-endpoints-image
-        :return: JSON data from server
         """
-        return await self._request("/image", {
-            "type": image_type
-        })
+        self.prefetch(image_type)
+        async for image in self._prefetcher.iter(image_type):
+            yield image
 
-    async def threats(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
+    async def batch(self, calls: typing.Iterable[typing.Union[Call, tuple]], *, concurrency: int = 8,
+                    ordered: bool = False) -> typing.AsyncIterator[BatchResult]:
         """
-        :param url: Image URL to add to template.
-        :param raw: Get raw image bytes
-        :return:
+        Run many endpoint calls with at most `concurrency` in flight at once
+        :param calls: Call or (name, args, kwargs) tuples, e.g. ("ship", (url1, url2), {"raw": True})
+        :param concurrency: Max calls running at the same time
+        :param ordered: Yield results in the order calls were given instead of as they complete
+        :return: Async iterator of BatchResult, failed calls have error set instead of aborting the batch
         """
-        return await self._request("/imagegen", {
-            "type": "threats",
-            "url": url,
-            "raw": str(int(raw))
-        })
+        pending = iter(enumerate(calls))
+        results = asyncio.Queue()
 
-    async def baguette(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Any image URL to generate, can be user avatar or anything.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "baguette",
-            "url": url,
-            "raw": str(int(raw))
-        })
+        async def worker():
+            try:
+                for index, spec in pending:
+                    call = spec
+                    try:
+                        call = Call(*spec)
+                        result = await getattr(self, call.name)(*call.args, **call.kwargs)
+                    except Exception as e:
+                        await results.put(BatchResult(index, call, error=e))
+                    else:
+                        await results.put(BatchResult(index, call, result))
+            finally:
+                await results.put(None)
 
-    async def clyde(self, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param text: Text to clydify.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "clyde",
-            "text": text,
-            "raw": str(int(raw))
-        })
+        workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+        running = len(workers)
+        buffered = {}
+        next_index = 0
+        try:
+            while running:
+                item = await results.get()
+                if item is None:
+                    running -= 1
+                    continue
+                if not ordered:
+                    yield item
+                    continue
+                buffered[item.index] = item
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in workers:
+                task.cancel()
 
-    async def ship(self, user1: str, user2: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param user1: User 1’s avatar
-        :param user2: User 2’s avatar
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "ship",
-            "user1": user1,
-            "user2": user2,
-            "raw": str(int(raw))
-        })
-
-    async def captcha(self, url: str, username: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: User’s avatar URL or any image.
-        :param username: User’s username or or any other string to show up.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "captcha",
-            "url": url,
-            "username": username,
-            "raw": str(int(raw))
-        })
-
-    async def whowouldwin(self, user1: str, user2: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param user1: User 1’s avatar
-        :param user2: User 2’s avatar
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "whowouldwin",
-            "user1": user1,
-            "user2": user2,
-            "raw": str(int(raw))
-        })
-
-    async def changemymind(self, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param text: Change my mind text.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "changemymind",
-            "text": text,
-            "raw": str(int(raw))
-        })
-
-    async def ddlc(self, character: str, background: str, body: str, face: str, text: str,
-             *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param character: Can be either monika, yuri, natsuki, sayori or m, y, n , s
-        :param background: Background of the image, types: bedroom, class, closet, club, corridor, house, kitchen,
-            residential, sayori_bedroom
-        :param body: Body of the character, there is only 1 or 2 for monika and 1, 1b, 2, 2b for the rest
-        :param face: Face of the character to go with the body, is best to just see all the types at
-            https://github.com/hibikidesu/NekoBot/blob/master/modules/fun.py#L14 (line14 to 34)
-        :param text: Text for the character to say, max length of 140
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "ddlc",
-            "character": character,
-            "background": background,
-            "body": body,
-            "face": face,
-            "text": text,
-            "raw": str(int(raw))
-        })
-
-    async def jpeg(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: URL to JPEGify, would be recommended if the URL is as an JPEG or JPG format but PNG will still work
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "jpeg",
-            "url": url,
-            "raw": str(int(raw))
-        })
+    async def _request(self, path: str, params: dict, *, deadline: float = None,
+                       priority: str = None) -> typing.Union[Response, ImageResult]:
+        if self.cache is not None:
+            data = self.cache.get(path, params)
+            if data is not None:
+                return data
+        fetch = self._hedged if self.hedge is not None else self._fetch
+        if path in self.coalesce or endpoint_name(path, params) in self.coalesce:
+            key = self._flight_key(make_key(path, params), priority)
+            return await self._within(path, deadline, self._coalesced(key, fetch, path, params, priority))
+        return await self._within(path, deadline, fetch(path, params, priority))
 
-    async def lolice(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Lolice chief
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "lolice",
-            "url": url,
-            "raw": str(int(raw))
-        })
+    def _flight_key(self, key: str, priority: typing.Optional[str]) -> str:
+        # Calls of different priority classes don't share a request, an interactive call shouldn't wait at bulk
+        if self.scheduler is None:
+            return key
+        return "{} {}".format(priority or self.scheduler.default, key)
 
-    async def kannagen(self, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param text: Text to kannafy
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "kannagen",
-            "text": text,
-            "raw": str(int(raw))
-        })
+    async def _get(self, url: str, params: dict, headers: dict, priority: str = None) -> AsyncTransportResponse:
+        """
+        Send one attempt, holding a scheduler slot until the response is released so retries, backoff and rate
+        limiter waits don't take up a slot
+        """
+        if self.scheduler is None:
+            return await self._http.get(url, params, headers)
+        await self.scheduler.acquire(priority)
+        try:
+            r = await self._http.get(url, params, headers)
+        except BaseException:
+            self.scheduler.release()
+            raise
+        return _Scheduled(r, self.scheduler)
 
-    async def iphonex(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Image to fill into an iphone.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "iphonex",
-            "url": url,
-            "raw": str(int(raw))
-        })
+    @staticmethod
+    async def _within(route: str, deadline: typing.Optional[float], awaitable: typing.Awaitable) -> typing.Any:
+        if deadline is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            # Timeouts of the request itself are raised as they are if the deadline hasn't passed
+            if time.monotonic() < deadline:
+                raise
+            raise DeadlineExceeded(route) from None
 
-    async def animeface(self, image: str) -> typing.Union[Response, bytes]:
-        """
-        :param image: Image to find heccin weaboos
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "animeface",
-            "image": image
-        })
+    async def _hedged(self, path: str, params: dict, priority: str = None) -> typing.Union[Response, ImageResult]:
+        delay = self.metrics.quantile(endpoint_name(path, params), self.hedge)
+        if delay is None:
+            return await self._fetch(path, params, priority)
+        pending = {asyncio.ensure_future(self._fetch(path, params, priority, hedged=True))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                # Slower than the hedge quantile, race a duplicate and use whichever succeeds first
+                pending.add(asyncio.ensure_future(self._fetch(path, params, priority, hedged=True)))
+            while True:
+                for task in done:
+                    if task.exception() is None or not pending:
+                        return task.result()
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
 
-    async def awooify(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Users avatar to AwOOOOify :3
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "awooify",
-            "url": url,
-            "raw": str(int(raw))
-        })
+    async def _coalesced(self, key: str, fetch: typing.Callable[..., typing.Awaitable], *args) -> typing.Any:
+        entry = self._inflight.get(key)
+        if entry is None:
+            entry = _InFlight(asyncio.ensure_future(fetch(*args)))
+            self._inflight[key] = entry
+            entry.task.add_done_callback(functools.partial(self._forget, key, entry))
+        entry.waiters += 1
+        try:
+            # Shielded so one cancelled caller doesn't cancel the request for everyone else waiting on it
+            return await asyncio.shield(entry.task)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.task.done():
+                # Forgotten right away so a new caller starts a fresh request instead of joining the cancelled one
+                self._forget(key, entry, entry.task)
+                entry.task.cancel()
 
-    async def trap(self, name: str, author: str, image: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param name: User to trap.
-        :param author: Author trapping user.
-        :param image: Avatar’s URL to trap.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "trap",
-            "name": name,
-            "author": author,
-            "image": image,
-            "raw": str(int(raw))
-        })
-
-    async def trumptweet(self, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param text: Text to TrumpTweet
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "trumptweet",
-            "text": text,
-            "raw": str(int(raw))
-        })
+    def _forget(self, key: str, entry: _InFlight, _: asyncio.Future):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
 
-    async def tweet(self, username: str, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param username: Twitter Username without the @
-        :param text: Text to tweet
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "tweet",
-            "username": username,
-            "text": text,
-            "raw": str(int(raw))
-        })
-
-    async def deepfry(self, image: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param image: Image URL to DeepFry.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "deepfry",
-            "image": image,
-            "raw": str(int(raw))
-        })
+    async def _fetch(self, path: str, params: dict, priority: str = None,
+                     hedged: bool = False) -> typing.Union[Response, ImageResult]:
+        with self._track(path, params) as tracker:
+            try:
+                async with await self._send(path, params, priority) as r:
+                    body = await r.read()
+            except asyncio.CancelledError:
+                # A cancelled hedge attempt says nothing about latency and would skew the hedge quantile
+                if hedged:
+                    tracker.discard()
+                raise
+            tracker.done(r.status, len(body))
+            try:
+                data = decode_response(r.status, r.content_type, body, r.headers)
+            except DecodeError:
+                tracker.parse_failed()
+                raise
+        if self.cache is not None and r.status == 200:
+            self.cache.put(path, params, data)
+        return data
 
-    async def blurpify(self, image: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param image: Image URL to Blurpify.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "blurpify",
-            "image": image,
-            "raw": str(int(raw))
-        })
+    async def fetch(self, url: str, *, timeout: float = None, priority: str = None) -> ImageResult:
+        """
+        Download an image URL returned by the API, e.g. Response.message, over this client's connection pool.
+        Concurrent fetches of the same URL share one request.
+        :param url: Absolute URL
+        :param timeout: Seconds the download may take including retries, defaults to the deadline for "fetch"
+        :param priority: Scheduler priority class
+        :return: Image bytes
+        :raises APIError: The server answered with an error status
+        """
+        if self.asset_cache is not None:
+            data = self.asset_cache.get(url)
+            if data is not None:
+                return data
+        return await self._within("fetch", self._deadline("fetch", {}, timeout),
+                                  self._coalesced(self._flight_key("fetch " + url, priority), self._fetch_url, url,
+                                                  priority))
 
-    async def phcomment(self, image: str, text: str, username: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param image: User image URL
-        :param text: Text to comment.
-        :param username: User’s Username
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "phcomment",
-            "image": image,
-            "text": text,
-            "username": username,
-            "raw": str(int(raw))
-        })
-
-    async def magik(self, image: str, intensity: int = 5, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param image: Image to magikify
-        :param intensity: an integer of magik intensity from 0 to 10
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "magik",
-            "image": image,
-            "intensity": intensity,
-            "raw": str(int(raw))
-        })
-
-    async def trash(self, url: str) -> typing.Union[Response, bytes]:
-        """
-        :param url: URL of trash waifu
-        :return:
-        """
-        return await self._request("/imagegen", {
-            "type": "trash",
-            "url": url
-        })
+    async def _resolve(self, endpoint: Endpoint, path: str, params: dict, *, deadline: float = None,
+                       priority: str = None) -> ImageResult:
+        return await self._within(path, deadline, self._resolve_plan(endpoint, path, params, priority))
 
-    async def stickbug(self, url: str) -> typing.Union[Response, bytes]:
+    async def _resolve_plan(self, endpoint: Endpoint, path: str, params: dict, priority: str) -> ImageResult:
+        plan = self._plan(endpoint, path, params)
+        if isinstance(plan, str):
+            return await self.fetch(plan, priority=priority)
+        data = await self._request(path, plan, priority=priority)
+        if isinstance(data, BaseImageResult):
+            return data
+        if not data.success:
+            raise APIError(data.status, data.message)
+        return await self.fetch(data.message, priority=priority)
+
+    async def _fetch_url(self, url: str, priority: str = None) -> ImageResult:
+        headers = {"User-Agent": self.user_agent}
+        if self.asset_cache is not None:
+            headers.update(self.asset_cache.validators(url))
+        attempt = 0
+        with self._track("fetch", {}) as tracker:
+            while True:
+                try:
+                    r = await self._get(url, {}, headers, priority)
+                except self._http.errors:
+                    if self.retry is None or attempt >= self.retry.max_retries:
+                        raise
+                    attempt += 1
+                    await asyncio.sleep(self.retry.delay(attempt))
+                    continue
+                if r.status == 304 and self.asset_cache is not None:
+                    r.release()
+                    data = self.asset_cache.revalidate(url, r.headers)
+                    if data is not None:
+                        tracker.done(r.status, 0)
+                        return data
+                    # Evicted since the validators were sent, download it again
+                    headers = {"User-Agent": self.user_agent}
+                    continue
+                if self.retry is not None and r.status in self.retry.statuses and attempt < self.retry.max_retries:
+                    r.release()
+                    attempt += 1
+                    await asyncio.sleep(self.retry.delay(attempt))
+                    continue
+                async with r:
+                    body = await r.read()
+                tracker.done(r.status, len(body))
+                if r.status >= 400:
+                    raise APIError(r.status, r.reason)
+                data = ImageResult(body, r.status, r.headers)
+                break
+        if self.asset_cache is not None:
+            self.asset_cache.put(url, data)
+        return data
+
+    async def iter_raw(self, name: str, *args, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       **kwargs) -> typing.AsyncIterator[bytes]:
+        """
+        Stream raw image bytes of an endpoint instead of buffering the whole body,
+        e.g. async for chunk in api.iter_raw("ship", url1, url2)
+        :param name: Endpoint method name
+        :param chunk_size: Max bytes per chunk
+        :return: Async iterator of byte chunks
+        """
+        path, params = endpoint_params(name, *args, **kwargs)
+        if self.cache is not None:
+            data = self.cache.get(path, params)
+            if isinstance(data, BaseImageResult):
+                # Chunks are copied out like the network path's so nothing keeps the cached buffer exported
+                with data.view as view:
+                    for i in range(0, len(view), chunk_size):
+                        yield view[i:i + chunk_size].tobytes()
+                return
+        with self._track(path, params) as tracker:
+            async with await self._within(path, self._deadline(path, params), self._send(path, params)) as r:
+                if r.content_type == "application/json" or r.status >= 400:
+                    data = decode_response(r.status, r.content_type, await r.read())
+                    raise APIError(r.status, data.message if isinstance(data, Response) else r.reason)
+                size = 0
+                async for chunk in r.iter_chunks(chunk_size):
+                    size += len(chunk)
+                    yield chunk
+                tracker.done(r.status, size)
+
+    async def download(self, name: str, *args, sink: typing.Union[str, os.PathLike, typing.BinaryIO],
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs) -> int:
+        """
+        Stream raw image bytes of an endpoint into a file, e.g. await api.download("stickbug", url, sink="bug.mp4")
+        :param name: Endpoint method name
+        :param sink: File path or binary file-like object to write to, async write methods are awaited
+        :param chunk_size: Max bytes per chunk
+        :return: Bytes written
+        """
+        f, owned = open_sink(sink)
+        written = 0
+        try:
+            async for chunk in self.iter_raw(name, *args, chunk_size=chunk_size, **kwargs):
+                result = f.write(chunk)
+                if inspect.isawaitable(result):
+                    await result
+                written += len(chunk)
+        finally:
+            if owned:
+                f.close()
+        return written
+
+    async def _probe(self, request: typing.Awaitable[AsyncTransportResponse],
+                     timeout: float) -> AsyncTransportResponse:
+        """
+        Bound a request checking on a demoted host, running out of time counts as a failed attempt
+        """
+        try:
+            return await asyncio.wait_for(request, timeout)
+        except asyncio.TimeoutError as e:
+            # Before Python 3.11 asyncio's TimeoutError isn't the builtin one transports may list
+            if isinstance(e, self._http.errors):
+                raise
+            raise TimeoutError("No response within {:.3f}s".format(timeout)) from None
+
+    async def _send(self, path: str, params: dict, priority: str = None) -> AsyncTransportResponse:
+        attempt = 0
+        limited = 0
+        rotated = 0
+        tried = []
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.allow(path)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(path, params)
+            token = self.keys.acquire() if self.keys is not None else self.authorization
+            base_url = self.hosts.pick(tried) if self.hosts is not None else self.BASE_URL
+            probe_timeout = self.hosts.timeout_for(base_url) if self.hosts is not None else None
+            started = time.monotonic()
+            try:
+                request = self._get(base_url + path, params, self._headers_for(token), priority)
+                r = await (request if probe_timeout is None else self._probe(request, probe_timeout))
+            except self._http.errors:
+                if self.keys is not None:
+                    self.keys.release(token)
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure(path)
+                if self.hosts is not None:
+                    self.hosts.record(base_url, time.monotonic() - started, False)
+                    # Fail over to the next host right away, backing off only once every host failed
+                    if len(tried) < len(self.hosts) - 1:
+                        tried.append(base_url)
+                        continue
+                    tried.clear()
+                if self.retry is None or attempt >= self.retry.max_retries:
+                    raise
+                attempt += 1
+                await asyncio.sleep(self.retry.delay(attempt))
+                continue
+            except BaseException:
+                if self.keys is not None:
+                    self.keys.release(token)
+                raise
+            if self.hosts is not None:
+                self.hosts.record(base_url, time.monotonic() - started, r.status < 500)
+            # A rejected key is retried right away with another one before the route is paused
+            if self.keys is not None and self.keys.release(token, r.status, r.headers) and rotated < len(self.keys):
+                rotated += 1
+                r.release()
+                continue
+            if self.rate_limiter is not None and self.rate_limiter.observe(path, params, r.status, r.headers) \
+                    and limited < self.rate_limiter.max_retries:
+                limited += 1
+                r.release()
+                continue
+            if r.status >= 500:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure(path)
+                if self.hosts is not None:
+                    if len(tried) < len(self.hosts) - 1:
+                        tried.append(base_url)
+                        r.release()
+                        continue
+                    tried.clear()
+                if self.retry is not None and r.status in self.retry.statuses and attempt < self.retry.max_retries:
+                    attempt += 1
+                    r.release()
+                    await asyncio.sleep(self.retry.delay(attempt))
+                    continue
+            elif self.circuit_breaker is not None:
+                self.circuit_breaker.record_success(path)
+            return r
+
+    async def get_image(self, image_type: str, *, timeout: float = None, priority: str = None) -> Response:
         """
-        :param url: Image url for stickbug
-        :return:
+        Get an image from the api
+        :param image_type: https://docs.nekobot.xyz/#image-endpoints-image
+        :param timeout: Seconds the call may take including retries, overrides the client's deadlines
+        :param priority: Scheduler priority class
+        :return: JSON data from server
         """
-        return await self._request("/imagegen", {
-            "type": "stickbug",
-            "url": url
-        })
+        if self._prefetcher is not None and image_type in self._prefetcher:
+            image = self._prefetcher.get_nowait(image_type)
+            if image is not None:
+                return image
+        params = {
+            "type": image_type
+        }
+        return await self._request("/image", params, deadline=self._deadline("/image", params, timeout),
+                                   priority=priority)
@@ -0,0 +1,170 @@
+from .asset_cache import AssetCache
+from .cache import BaseCache, endpoint_name
+from .endpoints import Endpoint
+from .errors import APIError, DeadlineExceeded, DecodeError
+from .hosts import HostPool
+from .keys import KeyPool
+from .metrics import Metrics, NULL_TRACKER
+from .ratelimit import RateLimiter
+from .result import ImageResult
+from .retry import CircuitBreaker, RetryPolicy
+from .transport import TransportConfig
+import json
+import os
+import time
+import typing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# How endpoints called with resolve=True get their bytes: auto fetches the URL of a cached result and otherwise asks
+# for raw bytes, raw always asks for raw bytes, url always generates and then fetches the returned URL
+RESOLVE_MODES = ("auto", "raw", "url")
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+class Response(typing.NamedTuple):
+    message: str
+    success: bool
+    version: str = ""
+    color: int = 0
+    status: int = 200
+
+
+class Call(typing.NamedTuple):
+    name: str
+    args: tuple = ()
+    kwargs: dict = {}
+
+
+class BatchResult(typing.NamedTuple):
+    index: int
+    call: Call
+    result: typing.Any = None
+    error: typing.Optional[BaseException] = None
+
+
+def decode_response(status: int, content_type: str, body: bytes,
+                    headers: typing.Mapping[str, str] = None) -> typing.Union[Response, ImageResult]:
+    """
+    Decode a response body based on its Content-Type, raw images are wrapped without trying JSON first
+    :param status: HTTP status
+    :param content_type: Content-Type without parameters
+    :param body: Response body
+    :param headers: Response headers kept on ImageResult
+    :return: Response for JSON bodies, ImageResult for anything else
+    :raises DecodeError: A JSON body could not be decoded into a Response
+    :raises APIError: The request failed with a body that isn't JSON, such as an HTML error page
+    """
+    if content_type == "application/json" or content_type.endswith("+json"):
+        try:
+            payload = json_loads(body)
+            return Response(**{k: v for k, v in payload.items() if k in Response._fields})
+        except (ValueError, TypeError, AttributeError):
+            raise DecodeError(status, content_type, body) from None
+    if status >= 400:
+        raise APIError(status, bytes(body[:200]).decode("utf-8", "replace"))
+    return ImageResult(body, status, headers)
+
+
+def open_sink(sink: typing.Union[str, os.PathLike, typing.BinaryIO]) -> typing.Tuple[typing.BinaryIO, bool]:
+    """
+    :param sink: File path or binary file-like object
+    :return: (file, whether it was opened here and has to be closed)
+    """
+    if isinstance(sink, (str, os.PathLike)):
+        return open(sink, "wb"), True
+    return sink, False
+
+
+class BaseClass:
+
+    BASE_URL = "https://nekobot.xyz/api"
+
+    def __init__(self, authorization: str = "", *, cache: BaseCache = None, rate_limiter: RateLimiter = None,
+                 retry: RetryPolicy = None, circuit_breaker: CircuitBreaker = None,
+                 transport_config: TransportConfig = None, metrics: Metrics = None, keys: KeyPool = None,
+                 hosts: HostPool = None, resolve_via: str = "auto", asset_cache: AssetCache = None,
+                 deadline: float = None, deadlines: typing.Dict[str, float] = None):
+        self.user_agent = "NekoBotAPI-py/1.0"
+        self.authorization = authorization
+        self.transport_config = transport_config or TransportConfig()
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.metrics = metrics
+        self.keys = keys
+        self.hosts = hosts
+        if resolve_via not in RESOLVE_MODES:
+            raise ValueError("resolve_via must be one of {}".format(", ".join(RESOLVE_MODES)))
+        self.resolve_via = resolve_via
+        self.asset_cache = asset_cache
+        self.deadline = deadline
+        self.deadlines = dict(deadlines or {})
+        self._prefetcher = None
+        self._http = None
+
+    @property
+    def _headers(self) -> dict:
+        return self._headers_for(self.authorization)
+
+    def _headers_for(self, token: str) -> dict:
+        return {
+            "User-Agent": self.user_agent,
+            "Authorization": token
+        }
+
+    def _track(self, path: str, params: dict):
+        return self.metrics.track(path, params) if self.metrics is not None else NULL_TRACKER
+
+    def _deadline(self, path: str, params: dict, timeout: float = None) -> typing.Optional[float]:
+        """
+        :param timeout: Seconds given to the call, falls back to the endpoint's and then the client's deadline
+        :return: Monotonic time the call has to finish by, None without a deadline
+        """
+        if timeout is None:
+            timeout = self.deadlines.get(endpoint_name(path, params), self.deadline)
+        return time.monotonic() + timeout if timeout is not None else None
+
+    @staticmethod
+    def _remaining(route: str, deadline: typing.Optional[float]) -> typing.Optional[float]:
+        """
+        :return: Seconds left until the deadline, None without one
+        :raises DeadlineExceeded: The deadline passed
+        """
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(route)
+        return remaining
+
+    def _backoff(self, attempt: int, deadline: typing.Optional[float]) -> float:
+        """
+        :return: Seconds to wait before a retry, never past the deadline
+        """
+        delay = self.retry.delay(attempt)
+        return delay if deadline is None else max(0.0, min(delay, deadline - time.monotonic()))
+
+    def _plan(self, endpoint: Endpoint, path: str, params: dict) -> typing.Union[str, dict]:
+        """
+        Pick how to get an endpoint's image bytes with the fewest round trips
+        :return: URL of an already generated image to fetch, or the query parameters to request with
+        """
+        if not endpoint.raw:
+            return params
+        generated = dict(params, raw="0")
+        if self.resolve_via == "url":
+            return generated
+        if self.resolve_via == "auto" and self.cache is not None:
+            data = self.cache.get(path, generated)
+            if isinstance(data, Response) and data.success:
+                return data.message
+        return dict(params, raw="1")
+
+    def _request(self, path: str, params: dict, *, deadline: float = None) -> dict:
+        raise NotImplementedError()
@@ -0,0 +1,339 @@
+from .endpoints import ENDPOINTS
+from .fake import AsyncFakeTransport, FakeBackend, FakeServer, FakeTransport
+from .transport import TransportConfig
+import argparse
+import asyncio
+import inspect
+import json
+import math
+import multiprocessing
+import platform
+import random
+import sys
+import threading
+import time
+import typing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CLIENTS = ("sync", "async")
+DEFAULT_MIX = "clyde=1,ship=1,magik=1,image=1"
+# Parameters that take an image URL, everything else gets text
+URL_PARAMS = frozenset({"url", "image", "user1", "user2"})
+
+
+def parse_mix(value: str) -> typing.Dict[str, float]:
+    """
+    :param value: Comma separated endpoint=weight pairs, e.g. "clyde=3,ship=1", image stands for get_image
+    :return: Weight by endpoint name
+    """
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name != "image" and name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError("Unknown endpoint {!r}".format(name))
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError("Weight of {} is not a number".format(name)) from None
+        if mix[name] <= 0:
+            raise argparse.ArgumentTypeError("Weight of {} has to be positive".format(name))
+    return mix
+
+
+def _calls(mix: typing.Dict[str, float], raw: bool, seed: int) -> typing.Iterator[typing.Tuple[str, tuple, dict]]:
+    """
+    Endless stream of (method name, args, kwargs) picked by weight, arguments differ between calls so no layer can
+    answer from a cache
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = list(mix.values())
+    n = 0
+    while True:
+        name = rng.choices(names, weights)[0]
+        n += 1
+        if name == "image":
+            yield "get_image", ("neko",), {}
+            continue
+        endpoint = ENDPOINTS[name]
+        args = tuple(
+            "https://fake.nekobot.xyz/bench/{}.png".format(n) if param.name in URL_PARAMS else "bench {}".format(n)
+            for param in endpoint.params if param.default is inspect.Parameter.empty
+        )
+        yield name, args, {"raw": True} if raw and endpoint.raw else {}
+
+
+def _peak_rss() -> typing.Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes everywhere but macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentile(latencies: typing.List[float], q: float) -> typing.Optional[float]:
+    if not latencies:
+        return None
+    return latencies[min(len(latencies) - 1, max(0, math.ceil(q * len(latencies)) - 1))]
+
+
+def summarize(client: str, latencies: typing.List[float], errors: int, duration: float, cpu: float) -> dict:
+    """
+    :param client: Client name
+    :param latencies: Seconds taken by each finished call
+    :param errors: Calls that raised
+    :param duration: Seconds measured
+    :param cpu: CPU seconds the process used while measuring
+    :return: Result entry of the JSON report
+    """
+    latencies = sorted(latencies)
+    calls = len(latencies) + errors
+    return {
+        "client": client,
+        "requests": len(latencies),
+        "errors": errors,
+        "duration": duration,
+        "throughput": len(latencies) / duration if duration else 0.0,
+        "latency": {
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else None
+        },
+        "cpu_per_request": cpu / calls if calls else None,
+        "peak_rss": _peak_rss()
+    }
+
+
+class _Recorder:
+    """
+    Collects calls that start after the warmup and finish before the end of the run
+    """
+
+    def __init__(self, start: float, end: float):
+        self.start = start
+        self.end = end
+        self.latencies = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, started: float, finished: float, ok: bool):
+        if started < self.start or finished > self.end:
+            return
+        with self._lock:
+            if ok:
+                self.latencies.append(finished - started)
+            else:
+                self.errors += 1
+
+
+def _sync_worker(client, calls: typing.Iterator, recorder: _Recorder):
+    while time.perf_counter() < recorder.end:
+        name, args, kwargs = next(calls)
+        started = time.perf_counter()
+        try:
+            getattr(client, name)(*args, **kwargs)
+            ok = True
+        except Exception:
+            ok = False
+        recorder.record(started, time.perf_counter(), ok)
+
+
+def run_sync(options: argparse.Namespace, url: str = None, backend: FakeBackend = None) -> dict:
+    """
+    Drive NekoBot with one thread and client per unit of concurrency
+    :param options: Parsed command line options
+    :param url: BASE_URL of a FakeServer, None to use an in-memory FakeTransport over backend
+    :param backend: Backend for the in-memory transport
+    """
+    from .client import NekoBot
+
+    clients = []
+    for _ in range(options.concurrency):
+        client = NekoBot(transport=FakeTransport(backend) if url is None else None)
+        if url is not None:
+            client.BASE_URL = url
+        clients.append(client)
+    now = time.perf_counter()
+    recorder = _Recorder(now + options.warmup, now + options.warmup + options.duration)
+    threads = [
+        threading.Thread(target=_sync_worker, args=(client, _calls(options.mix, options.raw, options.seed + i),
+                                                    recorder), daemon=True)
+        for i, client in enumerate(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(max(0.0, recorder.start - time.perf_counter()))
+    cpu = time.process_time()
+    time.sleep(max(0.0, recorder.end - time.perf_counter()))
+    cpu = time.process_time() - cpu
+    for thread in threads:
+        thread.join()
+    for client in clients:
+        client.close()
+    return summarize("sync", recorder.latencies, recorder.errors, options.duration, cpu)
+
+
+async def _async_worker(client, calls: typing.Iterator, recorder: _Recorder):
+    while time.perf_counter() < recorder.end:
+        name, args, kwargs = next(calls)
+        started = time.perf_counter()
+        try:
+            await getattr(client, name)(*args, **kwargs)
+            ok = True
+        except Exception:
+            ok = False
+        recorder.record(started, time.perf_counter(), ok)
+
+
+async def _run_async(options: argparse.Namespace, url: typing.Optional[str], backend: FakeBackend) -> dict:
+    from .async_client import NekoBotAsync
+
+    config = TransportConfig(pool_size=options.concurrency, max_per_host=options.concurrency)
+    async with NekoBotAsync(transport_config=config,
+                            transport=AsyncFakeTransport(backend) if url is None else None) as client:
+        if url is not None:
+            client.BASE_URL = url
+        now = time.perf_counter()
+        recorder = _Recorder(now + options.warmup, now + options.warmup + options.duration)
+        workers = [
+            asyncio.ensure_future(_async_worker(client, _calls(options.mix, options.raw, options.seed + i), recorder))
+            for i in range(options.concurrency)
+        ]
+        await asyncio.sleep(max(0.0, recorder.start - time.perf_counter()))
+        cpu = time.process_time()
+        await asyncio.sleep(max(0.0, recorder.end - time.perf_counter()))
+        cpu = time.process_time() - cpu
+        await asyncio.gather(*workers)
+    return summarize("async", recorder.latencies, recorder.errors, options.duration, cpu)
+
+
+def run_async(options: argparse.Namespace, url: str = None, backend: FakeBackend = None) -> dict:
+    """
+    Drive one NekoBotAsync with a task per unit of concurrency
+    :param options: Parsed command line options
+    :param url: BASE_URL of a FakeServer, None to use an in-memory AsyncFakeTransport over backend
+    :param backend: Backend for the in-memory transport
+    """
+    return asyncio.run(_run_async(options, url, backend))
+
+
+def _serve(conn, backend_options: dict):
+    with FakeServer(FakeBackend(**backend_options)) as server:
+        conn.send(server.url)
+        try:
+            conn.recv()
+        except EOFError:
+            pass
+
+
+def _backend_options(options: argparse.Namespace) -> dict:
+    return {
+        "latency": options.latency,
+        "jitter": options.jitter,
+        "error_rate": options.error_rate,
+        "payload_size": options.payload_size,
+        "seed": options.seed
+    }
+
+
+def parse_args(argv: typing.Sequence[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m NekoBot.bench",
+        description="Benchmark NekoBot and NekoBotAsync against a local fake API server"
+    )
+    parser.add_argument("--client", choices=CLIENTS + ("both",), default="both", help="Client to drive")
+    parser.add_argument("-c", "--concurrency", type=int, default=8,
+                        help="Threads for NekoBot, tasks for NekoBotAsync")
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="Seconds to measure for")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds to run before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Endpoint weights, e.g. clyde=3,ship=1, image stands for get_image")
+    parser.add_argument("--raw", action="store_true", help="Request raw image bytes where endpoints support it")
+    parser.add_argument("--transport", choices=("http", "memory"), default="http",
+                        help="http runs a FakeServer in a child process, memory answers in process without sockets "
+                             "to isolate client overhead")
+    parser.add_argument("--latency", type=float, default=0.0, help="Server side seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max random seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Chance from 0 to 1 of a 500 response")
+    parser.add_argument("--payload-size", type=int, default=64 * 1024, help="Bytes in raw images")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the endpoint mix and the server")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    options = parser.parse_args(argv)
+    if options.concurrency < 1 or options.duration <= 0 or options.warmup < 0:
+        parser.error("concurrency and duration have to be positive and warmup can't be negative")
+    return options
+
+
+def _format(result: dict) -> str:
+    def ms(value: typing.Optional[float]) -> str:
+        return "-" if value is None else "{:.2f}ms".format(value * 1000)
+
+    latency = result["latency"]
+    lines = [
+        "{client}: {requests} requests, {errors} errors in {duration:.1f}s, {throughput:.1f} req/s".format(**result),
+        "  latency mean {} p50 {} p95 {} p99 {} max {}".format(
+            ms(latency["mean"]), ms(latency["p50"]), ms(latency["p95"]), ms(latency["p99"]), ms(latency["max"])
+        ),
+        "  cpu {} per request, peak rss {}".format(
+            ms(result["cpu_per_request"]),
+            "-" if result["peak_rss"] is None else "{:.1f}MiB".format(result["peak_rss"] / 1024 / 1024)
+        )
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: typing.Sequence[str] = None) -> dict:
+    """
+    Run the benchmark and print the report, peak RSS is for the whole process so with --client both the async run
+    includes whatever the sync run reached
+    :param argv: Command line arguments, defaults to sys.argv
+    :return: Report
+    """
+    options = parse_args(argv)
+    clients = CLIENTS if options.client == "both" else (options.client,)
+    runners = {"sync": run_sync, "async": run_async}
+    results = []
+    if options.transport == "http":
+        # The server gets its own process so CPU time and RSS only cover the client
+        parent, child = multiprocessing.Pipe()
+        server = multiprocessing.Process(target=_serve, args=(child, _backend_options(options)), daemon=True)
+        server.start()
+        try:
+            url = parent.recv()
+            for client in clients:
+                results.append(runners[client](options, url=url))
+        finally:
+            parent.send(None)
+            server.join(5)
+    else:
+        for client in clients:
+            results.append(runners[client](options, backend=FakeBackend(**_backend_options(options))))
+    report = {
+        "config": {
+            "concurrency": options.concurrency,
+            "duration": options.duration,
+            "warmup": options.warmup,
+            "mix": options.mix,
+            "raw": options.raw,
+            "transport": options.transport,
+            "server": _backend_options(options)
+        },
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    if options.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("\n".join(_format(result) for result in results))
+    return report
+
+
+if __name__ == "__main__":
+    main()
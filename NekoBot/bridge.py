@@ -0,0 +1,143 @@
+from .async_client import NekoBotAsync
+from .base import Call
+from .endpoints import ENDPOINTS
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+import time
+import typing
+
+# NekoBotAsync coroutines the bridge gets blocking and *_async methods for
+MIRRORED = (*ENDPOINTS, "get_image", "fetch", "download")
+
+
+def _mirror(name: str) -> typing.Tuple[typing.Callable, typing.Callable]:
+    target = getattr(NekoBotAsync, name)
+    signature = inspect.signature(target)
+
+    def method(self, *args, **kwargs):
+        return self._wait(self.submit(name, *args, **kwargs))
+
+    def method_async(self, *args, **kwargs) -> concurrent.futures.Future:
+        return self.submit(name, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = target.__doc__
+    method.__signature__ = signature
+    method_async.__name__ = name + "_async"
+    method_async.__doc__ = """
+        Like {}() but returns a concurrent.futures.Future right away
+        """.format(name)
+    method_async.__signature__ = signature.replace(return_annotation=concurrent.futures.Future)
+    return method, method_async
+
+
+def _mirrored(cls: type) -> type:
+    """
+    Class decorator adding a blocking method and a *_async method returning a Future for every name in MIRRORED
+    """
+    for name in MIRRORED:
+        for method in _mirror(name):
+            method.__qualname__ = "{}.{}".format(cls.__qualname__, method.__name__)
+            method.__module__ = cls.__module__
+            setattr(cls, method.__name__, method)
+    return cls
+
+
+@_mirrored
+class NekoBotBridge:
+
+    def __init__(self, authorization: str = "", *, client: NekoBotAsync = None, **options):
+        """
+        Synchronous facade over a NekoBotAsync running on its own event loop thread. Methods block like NekoBot's,
+        their *_async variants and submit() return a concurrent.futures.Future so synchronous code can have many
+        calls in flight over one aiohttp connection pool without a thread per call.
+        :param authorization: API token
+        :param client: NekoBotAsync to run, it is closed with the bridge. Created from authorization and options if
+            not given
+        :param options: Keyword arguments passed to NekoBotAsync
+        """
+        self.client = client or NekoBotAsync(authorization, **options)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="nekobot-loop")
+        self._thread.start()
+        self._closed = False
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def __enter__(self) -> "NekoBotBridge":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _wait(self, future: concurrent.futures.Future) -> typing.Any:
+        if threading.current_thread() is self._thread:
+            future.cancel()
+            raise RuntimeError("Blocking NekoBotBridge calls can't be made from its own event loop, await the client")
+        return future.result()
+
+    async def _call(self, name: str, args: tuple, kwargs: dict) -> typing.Any:
+        return await getattr(self.client, name)(*args, **kwargs)
+
+    def submit(self, name: str, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Schedule a call on the event loop, e.g. bridge.submit("ship", url1, url2, raw=True)
+        :param name: NekoBotAsync method name
+        :return: Future for the call result, cancelling it cancels the call
+        """
+        if self._closed:
+            raise RuntimeError("NekoBotBridge is closed")
+        return asyncio.run_coroutine_threadsafe(self._call(name, args, kwargs), self._loop)
+
+    def batch(self, calls: typing.Iterable[typing.Union[Call, tuple]]) -> typing.List[concurrent.futures.Future]:
+        """
+        Schedule many calls
+        :param calls: Call or (name, args, kwargs) tuples
+        :return: Futures in the same order as calls
+        """
+        futures = []
+        for call in calls:
+            name, args, kwargs = Call(*call)
+            futures.append(self.submit(name, *args, **kwargs))
+        return futures
+
+    def map(self, name: str, *iterables, timeout: float = None, **kwargs) -> typing.Iterator[typing.Any]:
+        """
+        Call one endpoint for every set of arguments, e.g. bridge.map("clyde", texts), all calls are scheduled
+        before the first result is returned
+        :param name: NekoBotAsync method name
+        :param iterables: Positional arguments, zipped together like the builtin map
+        :param timeout: Seconds to wait for all results
+        :param kwargs: Keyword arguments passed to every call
+        :return: Iterator of results in argument order, the first failed call raises when reached
+        """
+        futures = [self.submit(name, *args, **kwargs) for args in zip(*iterables)]
+        end = None if timeout is None else time.monotonic() + timeout
+
+        def results():
+            try:
+                for future in futures:
+                    yield future.result(None if end is None else end - time.monotonic())
+            finally:
+                # Calls still running once the caller stops iterating are not needed anymore
+                for future in futures:
+                    future.cancel()
+
+        return results()
+
+    def close(self):
+        """
+        Close the client and stop the event loop thread
+        """
+        if self._closed:
+            return
+        self._closed = True
+        asyncio.run_coroutine_threadsafe(self.client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.close()
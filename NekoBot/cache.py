@@ -0,0 +1,161 @@
+import collections
+import json
+import threading
+import time
+import typing
+
+
+def make_key(path: str, params: dict) -> str:
+    """
+    Build a canonical cache key for a request, params are sorted and stringified the same way they go over the wire
+    :param path: API path, e.g. /imagegen
+    :param params: Query parameters
+    :return: Key string
+    """
+    return path + "?" + json.dumps(
+        {k: str(v) for k, v in params.items()},
+        sort_keys=True,
+        separators=(",", ":")
+    )
+
+
+def endpoint_name(path: str, params: dict) -> str:
+    """
+    Name used for per-endpoint settings, the imagegen type or the path for everything else
+    :param path: API path
+    :param params: Query parameters
+    :return: Endpoint name
+    """
+    if path == "/imagegen":
+        return params.get("type", path)
+    return path
+
+
+class BaseCache:
+
+    def get(self, path: str, params: dict) -> typing.Any:
+        raise NotImplementedError()
+
+    def put(self, path: str, params: dict, value: typing.Any):
+        raise NotImplementedError()
+
+    def clear(self):
+        raise NotImplementedError()
+
+    def stats(self) -> dict:
+        raise NotImplementedError()
+
+
+class ResultCache(BaseCache):
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, *, ttls: typing.Dict[str, float] = None,
+                 paths: typing.Iterable[str] = ("/imagegen",)):
+        """
+        In-memory LRU cache of request results with per-endpoint TTLs
+        :param maxsize: Max amount of results kept, least recently used results are evicted first
+        :param ttl: Default seconds a result stays valid
+        :param ttls: TTL overrides by endpoint name (imagegen type), 0 disables caching for that endpoint
+        :param paths: API paths that are cached, /image is left out as it returns random images
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.paths = frozenset(paths)
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def ttl_for(self, path: str, params: dict) -> float:
+        return self.ttls.get(endpoint_name(path, params), self.ttl)
+
+    def cacheable(self, path: str, params: dict) -> bool:
+        return path in self.paths and self.ttl_for(path, params) > 0
+
+    def get(self, path: str, params: dict) -> typing.Any:
+        """
+        Get a cached result
+        :param path: API path
+        :param params: Query parameters
+        :return: Cached result or None
+        """
+        if not self.cacheable(path, params):
+            return None
+        key = make_key(path, params)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, path: str, params: dict, value: typing.Any):
+        """
+        Store a result, unsuccessful API responses are never cached
+        :param path: API path
+        :param params: Query parameters
+        :param value: Response or raw bytes
+        """
+        if not self.cacheable(path, params) or not getattr(value, "success", True):
+            return
+        key = make_key(path, params)
+        expires = time.monotonic() + self.ttl_for(path, params)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize
+        }
+
+
+class TieredCache(BaseCache):
+
+    def __init__(self, *caches: BaseCache):
+        """
+        Chain caches from fastest to slowest, hits from slower caches are copied into the faster ones
+        :param caches: Caches to look through in order
+        """
+        self.caches = caches
+
+    def get(self, path: str, params: dict) -> typing.Any:
+        for i, cache in enumerate(self.caches):
+            value = cache.get(path, params)
+            if value is not None:
+                for faster in self.caches[:i]:
+                    faster.put(path, params, value)
+                return value
+        return None
+
+    def put(self, path: str, params: dict, value: typing.Any):
+        for cache in self.caches:
+            cache.put(path, params, value)
+
+    def clear(self):
+        for cache in self.caches:
+            cache.clear()
+
+    def stats(self) -> dict:
+        return {
+            "tiers": [cache.stats() for cache in self.caches]
+        }
@@ -1,357 +1,367 @@
+from .asset_cache import AssetCache
+from .base import BaseClass, Response, DEFAULT_CHUNK_SIZE, decode_response, open_sink
+from .cache import BaseCache
+from .endpoints import Endpoint, endpoint_params, endpoints
+from .errors import APIError, DeadlineExceeded, DecodeError
+from .hosts import HostPool
+from .keys import KeyPool
+from .metrics import Metrics
+from .prefetch import ImagePrefetcher
+from .ratelimit import RateLimiter
+from .result import BaseImageResult, ImageResult
+from .retry import CircuitBreaker, RetryPolicy
+from .transport import Transport, TransportConfig, TransportResponse
+import os
 import requests
+import requests.adapters
+import time
 import typing
 
 
-class Response(typing.NamedTuple):
-    message: str
-    success: bool
-    version: str = ""
-    color: int = 0
-    status: int = 200
+class RequestsResponse(TransportResponse):
 
+    def __init__(self, response: requests.Response):
+        self._response = response
+        self.status = response.status_code
+        self.reason = response.reason
+        self.headers = response.headers
 
-class BaseClass:
+    def read(self) -> bytes:
+        return self._response.content
 
-    BASE_URL = "https://nekobot.xyz/api"
-
-    def __init__(self, authorization: str = ""):
-        self.user_agent = "NekoBotAPI-py/1.0"
-        self.authorization = authorization
-        self._http = None
-
-    def _request(self, path: str, params: dict) -> dict:
-        raise NotImplementedError()
-
-
-class NekoBot(BaseClass):
-
-    def __init__(self, authorization: str = ""):
-        super().__init__(authorization)
-        self._http = requests.Session()
+    def iter_chunks(self, chunk_size: int) -> typing.Iterator[bytes]:
+        return self._response.iter_content(chunk_size)
 
     def close(self):
-        self._http.close()
+        self._response.close()
 
-    def _request(self, path: str, params: dict) -> typing.Union[Response, bytes]:
-        r = self._http.get(
-            self.BASE_URL + path,
-            params=params,
-            headers={
-                "User-Agent": self.user_agent,
-                "Authorization": self.authorization
-            }
-        )
-        try:
-            data = Response(**r.json())
-        except Exception as e:
-            data = r.content
-        return data
-
-    def get_image(self, image_type: str) -> Response:
-        """
-        Get an image from the api
-        :param image_type: https://docs.nekobot.xyz/#image-endpoints-image
-        :return: JSON data from server
-        """
-        return self._request("/image", {
-            "type": image_type
-        })
-
-    def threats(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Image URL to add to template.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "threats",
-            "url": url,
-            "raw": str(int(raw))
-        })
 
-    def baguette(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Any image URL to generate, can be user avatar or anything.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "baguette",
-            "url": url,
-            "raw": str(int(raw))
-        })
-
-    def clyde(self, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param text: Text to clydify.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "clyde",
-            "text": text,
-            "raw": str(int(raw))
-        })
-
-    def ship(self, user1: str, user2: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param user1: User 1’s avatar
-        :param user2: User 2’s avatar
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "ship",
-            "user1": user1,
-            "user2": user2,
-            "raw": str(int(raw))
-        })
-
-    def captcha(self, url: str, username: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: User’s avatar URL or any image.
-        :param username: User’s username or or any other string to show up.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "captcha",
-            "url": url,
-            "username": username,
-            "raw": str(int(raw))
-        })
-
-    def whowouldwin(self, user1: str, user2: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param user1: User 1’s avatar
-        :param user2: User 2’s avatar
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "whowouldwin",
-            "user1": user1,
-            "user2": user2,
-            "raw": str(int(raw))
-        })
-
-    def changemymind(self, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param text: Change my mind text.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "changemymind",
-            "text": text,
-            "raw": str(int(raw))
-        })
-
-    def ddlc(self, character: str, background: str, body: str, face: str, text: str,
-             *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param character: Can be either monika, yuri, natsuki, sayori or m, y, n , s
-        :param background: Background of the image, types: bedroom, class, closet, club, corridor, house, kitchen,
-            residential, sayori_bedroom
-        :param body: Body of the character, there is only 1 or 2 for monika and 1, 1b, 2, 2b for the rest
-        :param face: Face of the character to go with the body, is best to just see all the types at
-            https://github.com/hibikidesu/NekoBot/blob/master/modules/fun.py#L14 (line14 to 34)
-        :param text: Text for the character to say, max length of 140
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "ddlc",
-            "character": character,
-            "background": background,
-            "body": body,
-            "face": face,
-            "text": text,
-            "raw": str(int(raw))
-        })
+class RequestsTransport(Transport):
+    errors = (requests.ConnectionError, requests.Timeout)
 
-    def jpeg(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
+    def __init__(self, config: TransportConfig = None):
         """
-        :param url: URL to JPEGify, would be recommended if the URL is as an JPEG or JPG format but PNG will still work
-        :param raw: Get raw image bytes
-        :return:
+        Default transport for NekoBot, a requests.Session with a connection pool sized by config
+        :param config: Connection pool and timeout settings
         """
-        return self._request("/imagegen", {
-            "type": "jpeg",
-            "url": url,
-            "raw": str(int(raw))
-        })
-
-    def lolice(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Lolice chief
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "lolice",
-            "url": url,
-            "raw": str(int(raw))
-        })
-
-    def kannagen(self, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param text: Text to kannafy
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "kannagen",
-            "text": text,
-            "raw": str(int(raw))
-        })
-
-    def iphonex(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Image to fill into an iphone.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "iphonex",
-            "url": url,
-            "raw": str(int(raw))
-        })
-
-    def animeface(self, image: str) -> typing.Union[Response, bytes]:
-        """
-        :param image: Image to find heccin weaboos
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "animeface",
-            "image": image
-        })
+        self.config = config or TransportConfig()
+        self.session = requests.Session()
+        default = requests.adapters.DEFAULT_POOLSIZE
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.config.pool_size if self.config.pool_size is not None else default,
+            pool_maxsize=self.config.max_per_host if self.config.max_per_host is not None else default
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, params: dict, headers: dict, *, stream: bool = False,
+            timeout: float = None) -> RequestsResponse:
+        connect_timeout, read_timeout = self.config.connect_timeout, self.config.read_timeout
+        if timeout is not None:
+            connect_timeout = min(connect_timeout or timeout, timeout)
+            read_timeout = min(read_timeout or timeout, timeout)
+        return RequestsResponse(self.session.get(
+            url,
+            params=params,
+            headers=headers,
+            stream=stream,
+            timeout=(connect_timeout, read_timeout)
+        ))
 
-    def awooify(self, url: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param url: Users avatar to AwOOOOify :3
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "awooify",
-            "url": url,
-            "raw": str(int(raw))
-        })
+    def fork(self) -> "RequestsTransport":
+        return RequestsTransport(self.config)
 
-    def trap(self, name: str, author: str, image: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param name: User to trap.
-        :param author: Author trapping user.
-        :param image: Avatar’s URL to trap.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "trap",
-            "name": name,
-            "author": author,
-            "image": image,
-            "raw": str(int(raw))
-        })
+    def close(self):
+        self.session.close()
 
-    def trumptweet(self, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param text: Text to TrumpTweet
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "trumptweet",
-            "text": text,
-            "raw": str(int(raw))
-        })
 
-    def tweet(self, username: str, text: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param username: Twitter Username without the @
-        :param text: Text to tweet
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "tweet",
-            "username": username,
-            "text": text,
-            "raw": str(int(raw))
-        })
+@endpoints
+class NekoBot(BaseClass):
 
-    def deepfry(self, image: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param image: Image URL to DeepFry.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "deepfry",
-            "image": image,
-            "raw": str(int(raw))
-        })
+    def __init__(self, authorization: str = "", *, cache: BaseCache = None, rate_limiter: RateLimiter = None,
+                 retry: RetryPolicy = None, circuit_breaker: CircuitBreaker = None,
+                 transport_config: TransportConfig = None, transport: Transport = None, metrics: Metrics = None,
+                 keys: KeyPool = None, hosts: HostPool = None,
+                 resolve_via: str = "auto", asset_cache: AssetCache = None, deadline: float = None,
+                 deadlines: typing.Dict[str, float] = None):
+        """
+        :param authorization: API token
+        :param cache: Optional result cache
+        :param rate_limiter: Optional rate limiter, can be shared with other clients
+        :param retry: Optional retry policy for connection errors and 5xx responses
+        :param circuit_breaker: Optional circuit breaker, can be shared with other clients
+        :param transport_config: Connection pool and timeout settings
+        :param transport: Transport to send requests with, defaults to a RequestsTransport using transport_config
+        :param metrics: Optional metrics collector, can be shared with other clients
+        :param keys: Optional pool of API tokens to spread requests over instead of authorization
+        :param hosts: Optional pool of base URLs to route requests over instead of BASE_URL
+        :param resolve_via: How endpoints called with resolve=True get the image, auto, raw or url
+        :param asset_cache: Optional HTTP cache for image URLs downloaded with fetch(), can be shared with other
+            clients
+        :param deadline: Default seconds a call may take including retries, None waits forever
+        :param deadlines: Deadline overrides by endpoint name, imagegen type or path
+        """
+        super().__init__(authorization, cache=cache, rate_limiter=rate_limiter, retry=retry,
+                         circuit_breaker=circuit_breaker, transport_config=transport_config, metrics=metrics,
+                         keys=keys, hosts=hosts,
+                         resolve_via=resolve_via, asset_cache=asset_cache, deadline=deadline, deadlines=deadlines)
+        self._http = transport or RequestsTransport(self.transport_config)
 
-    def blurpify(self, image: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
-        """
-        :param image: Image URL to Blurpify.
-        :param raw: Get raw image bytes
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "blurpify",
-            "image": image,
-            "raw": str(int(raw))
-        })
+    def close(self):
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+        self._http.close()
 
-    def phcomment(self, image: str, text: str, username: str, *, raw: bool = False) -> typing.Union[Response, bytes]:
+    def prefetch(self, *image_types: str, low: int = 2, high: int = 8):
         """
-        :param image: User image URL
-        :param text: Text to comment.
-        :param username: User’s Username
-        :param raw: Get raw image bytes
-        :return:
+        Fetch get_image results ahead of time in a background thread, get_image then returns from the queue
+        while it has images
+        :param image_types: Image types to prefetch
+        :param low: Refill once a queue has this many images or less
+        :param high: Max images kept per type
         """
-        return self._request("/imagegen", {
-            "type": "phcomment",
-            "image": image,
-            "text": text,
-            "username": username,
-            "raw": str(int(raw))
-        })
+        if self._prefetcher is None:
+            client = NekoBot(self.authorization, rate_limiter=self.rate_limiter, retry=self.retry,
+                             circuit_breaker=self.circuit_breaker, transport_config=self.transport_config,
+                             transport=self._http.fork(), metrics=self.metrics, keys=self.keys,
+                             hosts=self.hosts, resolve_via=self.resolve_via,
+                             asset_cache=self.asset_cache, deadline=self.deadline, deadlines=self.deadlines)
+            client.BASE_URL = self.BASE_URL
+            self._prefetcher = ImagePrefetcher(client, low, high)
+        for image_type in image_types:
+            self._prefetcher.start(image_type)
 
-    def magik(self, image: str, intensity: int = 5, *, raw: bool = False) -> typing.Union[Response, bytes]:
+    def iter_images(self, image_type: str) -> typing.Iterator[Response]:
         """
-        :param image: Image to magikify
-        :param intensity: an integer of magik intensity from 0 to 10
-        :param raw: Get raw image bytes
-        :return:
+        Endless iterator of images of one type served from the prefetch queue
+        :param image_type: https://docs.nekobot.xyz/#image-endpoints-image
         """
-        return self._request("/imagegen", {
-            "type": "magik",
-            "image": image,
-            "intensity": intensity,
-            "raw": str(int(raw))
-        })
+        self.prefetch(image_type)
+        return self._prefetcher.iter(image_type)
+
+    def _request(self, path: str, params: dict, *, deadline: float = None) -> typing.Union[Response, ImageResult]:
+        if self.cache is not None:
+            data = self.cache.get(path, params)
+            if data is not None:
+                return data
+        with self._track(path, params) as tracker:
+            with self._send(path, params, deadline=deadline) as r:
+                body = r.read()
+            tracker.done(r.status, len(body))
+            try:
+                data = decode_response(r.status, r.content_type, body, r.headers)
+            except DecodeError:
+                tracker.parse_failed()
+                raise
+        if self.cache is not None and r.status == 200:
+            self.cache.put(path, params, data)
+        return data
 
-    def trash(self, url: str) -> typing.Union[Response, bytes]:
-        """
-        :param url: URL of trash waifu
-        :return:
-        """
-        return self._request("/imagegen", {
-            "type": "trash",
-            "url": url
-        })
+    def _resolve(self, endpoint: Endpoint, path: str, params: dict, *, deadline: float = None) -> ImageResult:
+        plan = self._plan(endpoint, path, params)
+        if isinstance(plan, str):
+            return self._fetch_url(plan, deadline=deadline)
+        data = self._request(path, plan, deadline=deadline)
+        if isinstance(data, BaseImageResult):
+            return data
+        if not data.success:
+            raise APIError(data.status, data.message)
+        return self._fetch_url(data.message, deadline=deadline)
+
+    def fetch(self, url: str, *, timeout: float = None) -> ImageResult:
+        """
+        Download an image URL returned by the API, e.g. Response.message, over this client's connection pool
+        :param url: Absolute URL
+        :param timeout: Seconds the download may take including retries, defaults to the deadline for "fetch"
+        :return: Image bytes
+        :raises APIError: The server answered with an error status
+        """
+        return self._fetch_url(url, deadline=self._deadline("fetch", {}, timeout))
+
+    def _fetch_url(self, url: str, *, deadline: float = None) -> ImageResult:
+        if self.asset_cache is not None:
+            data = self.asset_cache.get(url)
+            if data is not None:
+                return data
+        headers = {"User-Agent": self.user_agent}
+        if self.asset_cache is not None:
+            headers.update(self.asset_cache.validators(url))
+        attempt = 0
+        with self._track("fetch", {}) as tracker:
+            while True:
+                timeout = self._remaining("fetch", deadline)
+                try:
+                    r = self._http.get(url, {}, headers, timeout=timeout)
+                except self._http.errors as e:
+                    # The timeout was capped by the deadline, report it like the async client does
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DeadlineExceeded("fetch") from e
+                    if self.retry is None or attempt >= self.retry.max_retries:
+                        raise
+                    attempt += 1
+                    time.sleep(self._backoff(attempt, deadline))
+                    continue
+                if r.status == 304 and self.asset_cache is not None:
+                    r.close()
+                    data = self.asset_cache.revalidate(url, r.headers)
+                    if data is not None:
+                        tracker.done(r.status, 0)
+                        return data
+                    # Evicted since the validators were sent, download it again
+                    headers = {"User-Agent": self.user_agent}
+                    continue
+                if self.retry is not None and r.status in self.retry.statuses and attempt < self.retry.max_retries:
+                    r.close()
+                    attempt += 1
+                    time.sleep(self._backoff(attempt, deadline))
+                    continue
+                with r:
+                    body = r.read()
+                tracker.done(r.status, len(body))
+                if r.status >= 400:
+                    raise APIError(r.status, r.reason)
+                data = ImageResult(body, r.status, r.headers)
+                break
+        if self.asset_cache is not None:
+            self.asset_cache.put(url, data)
+        return data
 
-    def stickbug(self, url: str) -> typing.Union[Response, bytes]:
+    def iter_raw(self, name: str, *args, chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs) -> typing.Iterator[bytes]:
+        """
+        Stream raw image bytes of an endpoint instead of buffering the whole body,
+        e.g. api.iter_raw("ship", url1, url2)
+        :param name: Endpoint method name
+        :param chunk_size: Max bytes per chunk
+        :return: Iterator of byte chunks
+        """
+        path, params = endpoint_params(name, *args, **kwargs)
+        if self.cache is not None:
+            data = self.cache.get(path, params)
+            if isinstance(data, BaseImageResult):
+                # Chunks are copied out like the network path's so nothing keeps the cached buffer exported
+                with data.view as view:
+                    for i in range(0, len(view), chunk_size):
+                        yield view[i:i + chunk_size].tobytes()
+                return
+        with self._track(path, params) as tracker, \
+                self._send(path, params, stream=True, deadline=self._deadline(path, params)) as r:
+            if r.content_type == "application/json" or r.status >= 400:
+                data = decode_response(r.status, r.content_type, r.read())
+                raise APIError(r.status, data.message if isinstance(data, Response) else r.reason)
+            size = 0
+            for chunk in r.iter_chunks(chunk_size):
+                size += len(chunk)
+                yield chunk
+            tracker.done(r.status, size)
+
+    def download(self, name: str, *args, sink: typing.Union[str, os.PathLike, typing.BinaryIO],
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs) -> int:
+        """
+        Stream raw image bytes of an endpoint into a file, e.g. api.download("stickbug", url, sink="bug.mp4")
+        :param name: Endpoint method name
+        :param sink: File path or binary file-like object to write to
+        :param chunk_size: Max bytes per chunk
+        :return: Bytes written
+        """
+        f, owned = open_sink(sink)
+        written = 0
+        try:
+            for chunk in self.iter_raw(name, *args, chunk_size=chunk_size, **kwargs):
+                f.write(chunk)
+                written += len(chunk)
+        finally:
+            if owned:
+                f.close()
+        return written
+
+    def _send(self, path: str, params: dict, *, stream: bool = False, deadline: float = None) -> TransportResponse:
+        attempt = 0
+        limited = 0
+        rotated = 0
+        tried = []
+        while True:
+            self._remaining(path, deadline)
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.allow(path)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(path, params, deadline)
+            # Measured after waiting on the rate limiter, Retry-After pauses count against the deadline too
+            timeout = self._remaining(path, deadline)
+            token = self.keys.acquire() if self.keys is not None else self.authorization
+            base_url = self.hosts.pick(tried) if self.hosts is not None else self.BASE_URL
+            probe_timeout = self.hosts.timeout_for(base_url) if self.hosts is not None else None
+            if probe_timeout is not None:
+                timeout = probe_timeout if timeout is None else min(timeout, probe_timeout)
+            started = time.monotonic()
+            try:
+                r = self._http.get(base_url + path, params, self._headers_for(token), stream=stream, timeout=timeout)
+            except self._http.errors as e:
+                if self.keys is not None:
+                    self.keys.release(token)
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure(path)
+                if self.hosts is not None:
+                    self.hosts.record(base_url, time.monotonic() - started, False)
+                # The timeout was capped by the deadline, report it like the async client does
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise DeadlineExceeded(path) from e
+                if self.hosts is not None:
+                    # Fail over to the next host right away, backing off only once every host failed
+                    if len(tried) < len(self.hosts) - 1:
+                        tried.append(base_url)
+                        continue
+                    tried.clear()
+                if self.retry is None or attempt >= self.retry.max_retries:
+                    raise
+                attempt += 1
+                time.sleep(self._backoff(attempt, deadline))
+                continue
+            except BaseException:
+                if self.keys is not None:
+                    self.keys.release(token)
+                raise
+            if self.hosts is not None:
+                self.hosts.record(base_url, time.monotonic() - started, r.status < 500)
+            # A rejected key is retried right away with another one before the route is paused
+            if self.keys is not None and self.keys.release(token, r.status, r.headers) and rotated < len(self.keys):
+                rotated += 1
+                r.close()
+                continue
+            if self.rate_limiter is not None and self.rate_limiter.observe(path, params, r.status, r.headers) \
+                    and limited < self.rate_limiter.max_retries:
+                limited += 1
+                r.close()
+                continue
+            if r.status >= 500:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure(path)
+                if self.hosts is not None:
+                    if len(tried) < len(self.hosts) - 1:
+                        tried.append(base_url)
+                        r.close()
+                        continue
+                    tried.clear()
+                if self.retry is not None and r.status in self.retry.statuses and attempt < self.retry.max_retries:
+                    attempt += 1
+                    r.close()
+                    time.sleep(self._backoff(attempt, deadline))
+                    continue
+            elif self.circuit_breaker is not None:
+                self.circuit_breaker.record_success(path)
+            return r
+
+    def get_image(self, image_type: str, *, timeout: float = None) -> Response:
         """
-        :param url: Image url for stickbug
-        :return:
+        Get an image from the api
+        :param image_type: https://docs.nekobot.xyz/#image-endpoints-image
+        :param timeout: Seconds the call may take including retries, overrides the client's deadlines
+        :return: JSON data from server
         """
-        return self._request("/imagegen", {
-            "type": "stickbug",
-            "url": url
-        })
+        if self._prefetcher is not None and image_type in self._prefetcher:
+            image = self._prefetcher.get(image_type, block=False)
+            if image is not None:
+                return image
+        params = {
+            "type": image_type
+        }
+        return self._request("/image", params, deadline=self._deadline("/image", params, timeout))
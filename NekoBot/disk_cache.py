@@ -0,0 +1,194 @@
+from .cache import BaseCache, make_key
+from .result import BaseImageResult, ImageResult, MappedImageResult
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import typing
+
+
+class DiskCache(BaseCache):
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, *,
+                 paths: typing.Iterable[str] = ("/imagegen",), low_watermark: float = 0.9):
+        """
+        Content-addressed on-disk store for raw image bytes, safe to share between processes on one host
+        :param directory: Directory to keep the index and blobs in, created if missing
+        :param max_bytes: Byte budget for stored blobs, least recently used blobs are removed past it
+        :param paths: API paths that are cached
+        :param low_watermark: Fraction of max_bytes eviction trims down to, so the next stores don't scan the
+            blobs again
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self.paths = frozenset(paths)
+        self.hits = 0
+        self.misses = 0
+        self._index_dir = os.path.join(directory, "index")
+        self._blob_dir = os.path.join(directory, "blobs")
+        self._bytes = None
+        self._lock = threading.Lock()
+        os.makedirs(self._index_dir, exist_ok=True)
+        os.makedirs(self._blob_dir, exist_ok=True)
+
+    def _index_path(self, path: str, params: dict) -> str:
+        name = hashlib.sha256(make_key(path, params).encode()).hexdigest()
+        return os.path.join(self._index_dir, name)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blob_dir, digest[:2], digest)
+
+    @staticmethod
+    def _write_atomic(target: str, data):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _map(self, path: str, params: dict) -> typing.Union[mmap.mmap, bytes, None]:
+        if path not in self.paths:
+            return None
+        index = self._index_path(path, params)
+        blob = None
+        try:
+            with open(index, "r") as f:
+                blob = self._blob_path(f.read().strip())
+            with open(blob, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            os.utime(blob)
+        except (FileNotFoundError, ValueError):
+            if blob is not None:
+                # The blob was evicted, drop the index entry pointing at it
+                try:
+                    os.unlink(index)
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def get(self, path: str, params: dict) -> typing.Optional[ImageResult]:
+        """
+        Get stored bytes for a request, the blob is memory-mapped and copied once into the result so hits and misses
+        both return the same bytes-like ImageResult
+        :param path: API path
+        :param params: Query parameters
+        :return: ImageResult or None
+        """
+        data = self._map(path, params)
+        if isinstance(data, mmap.mmap):
+            with data:
+                return ImageResult(data)
+        return None if data is None else ImageResult(data)
+
+    def get_mapped(self, path: str, params: dict) -> typing.Optional[MappedImageResult]:
+        """
+        Get stored bytes for a request without copying them, the clients use get()
+        :param path: API path
+        :param params: Query parameters
+        :return: MappedImageResult over a read-only mmap of the blob or None
+        """
+        data = self._map(path, params)
+        return None if data is None else MappedImageResult(data)
+
+    def put(self, path: str, params: dict, value: typing.Any):
+        """
+        Store a raw image, JSON responses are ignored
+        :param path: API path
+        :param params: Query parameters
+        :param value: ImageResult or raw bytes
+        """
+        if path not in self.paths:
+            return
+        if isinstance(value, BaseImageResult):
+            value = value.view
+        elif not isinstance(value, (bytes, bytearray, memoryview, mmap.mmap)):
+            return
+        digest = hashlib.sha256(value).hexdigest()
+        blob = self._blob_path(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            self._write_atomic(blob, value)
+            size = memoryview(value).nbytes
+            # Blobs stored by other processes are only counted by the scan in evict()
+            with self._lock:
+                full = self._bytes is None or self._bytes + size > self.max_bytes
+                if not full:
+                    self._bytes += size
+            if full:
+                self.evict()
+        self._write_atomic(self._index_path(path, params), digest.encode())
+
+    def evict(self):
+        """
+        Remove least recently used blobs until the store fits in low_watermark of max_bytes once it is over
+        max_bytes, index entries pointing at removed blobs are unlinked on their next lookup
+        """
+        blobs = []
+        total = 0
+        for root, _, files in os.walk(self._blob_dir):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                blobs.append((st.st_mtime, st.st_size, os.path.join(root, name)))
+                total += st.st_size
+        if total > self.max_bytes:
+            target = self.max_bytes * self.low_watermark
+            blobs.sort()
+            for _, size, blob in blobs:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(blob)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        with self._lock:
+            self._bytes = total
+
+    def clear(self):
+        for directory in (self._index_dir, self._blob_dir):
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    try:
+                        os.unlink(os.path.join(root, name))
+                    except FileNotFoundError:
+                        pass
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        size = 0
+        count = 0
+        for root, _, files in os.walk(self._blob_dir):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    continue
+                try:
+                    size += os.stat(os.path.join(root, name)).st_size
+                except FileNotFoundError:
+                    continue
+                count += 1
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "blobs": count,
+            "bytes": size,
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,214 @@
+import inspect
+import typing
+
+
+class Param(typing.NamedTuple):
+    name: str
+    doc: str
+    default: typing.Any = inspect.Parameter.empty
+
+
+class Endpoint(typing.NamedTuple):
+    """
+    One imagegen endpoint, the client methods are generated from these
+    """
+    name: str
+    params: typing.Tuple[Param, ...]
+    raw: bool = True
+    path: str = "/imagegen"
+
+    @property
+    def signature(self) -> inspect.Signature:
+        parameters = [inspect.Parameter(
+            param.name, inspect.Parameter.POSITIONAL_OR_KEYWORD, default=param.default,
+            annotation=str if param.default is inspect.Parameter.empty else type(param.default)
+        ) for param in self.params]
+        if self.raw:
+            parameters.append(inspect.Parameter("raw", inspect.Parameter.KEYWORD_ONLY, default=False, annotation=bool))
+        return inspect.Signature(parameters)
+
+    def docstring(self, *extra: str) -> str:
+        """
+        :param extra: Lines documenting client specific arguments
+        """
+        lines = [":param {}: {}".format(param.name, param.doc) for param in self.params]
+        if self.raw:
+            lines.append(":param raw: Get raw image bytes")
+        lines.append(":param resolve: Get the image bytes, following the returned URL if the API doesn't send them")
+        lines.append(":param timeout: Seconds the call may take including retries, overrides the client's deadlines")
+        lines.extend(extra)
+        lines.append(":return:")
+        return "\n" + "\n".join("        " + line for line in lines) + "\n        "
+
+    def request(self, *args, **kwargs) -> typing.Tuple[str, dict]:
+        """
+        Bind call arguments to this endpoint
+        :return: Path and query parameters
+        """
+        bound = _signatures[self.name].bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = {"type": self.name}
+        for name, value in bound.arguments.items():
+            params[name] = str(int(value)) if name == "raw" else value
+        return self.path, params
+
+
+ENDPOINTS = {endpoint.name: endpoint for endpoint in (
+    Endpoint("threats", (
+        Param("url", "Image URL to add to template."),
+    )),
+    Endpoint("baguette", (
+        Param("url", "Any image URL to generate, can be user avatar or anything."),
+    )),
+    Endpoint("clyde", (
+        Param("text", "Text to clydify."),
+    )),
+    Endpoint("ship", (
+        Param("user1", "User 1’s avatar"),
+        Param("user2", "User 2’s avatar")
+    )),
+    Endpoint("captcha", (
+        Param("url", "User’s avatar URL or any image."),
+        Param("username", "User’s username or or any other string to show up.")
+    )),
+    Endpoint("whowouldwin", (
+        Param("user1", "User 1’s avatar"),
+        Param("user2", "User 2’s avatar")
+    )),
+    Endpoint("changemymind", (
+        Param("text", "Change my mind text."),
+    )),
+    Endpoint("ddlc", (
+        Param("character", "Can be either monika, yuri, natsuki, sayori or m, y, n , s"),
+        Param("background", "Background of the image, types: bedroom, class, closet, club, corridor, house, "
+                            "kitchen,\n            residential, sayori_bedroom"),
+        Param("body", "Body of the character, there is only 1 or 2 for monika and 1, 1b, 2, 2b for the rest"),
+        Param("face", "Face of the character to go with the body, is best to just see all the types at\n"
+                      "            https://github.com/hibikidesu/NekoBot/blob/master/modules/fun.py#L14 "
+                      "(line14 to 34)"),
+        Param("text", "Text for the character to say, max length of 140")
+    )),
+    Endpoint("jpeg", (
+        Param("url", "URL to JPEGify, would be recommended if the URL is as an JPEG or JPG format but PNG will "
+                     "still work"),
+    )),
+    Endpoint("lolice", (
+        Param("url", "Lolice chief"),
+    )),
+    Endpoint("kannagen", (
+        Param("text", "Text to kannafy"),
+    )),
+    Endpoint("iphonex", (
+        Param("url", "Image to fill into an iphone."),
+    )),
+    Endpoint("animeface", (
+        Param("image", "Image to find heccin weaboos"),
+    ), raw=False),
+    Endpoint("awooify", (
+        Param("url", "Users avatar to AwOOOOify :3"),
+    )),
+    Endpoint("trap", (
+        Param("name", "User to trap."),
+        Param("author", "Author trapping user."),
+        Param("image", "Avatar’s URL to trap.")
+    )),
+    Endpoint("trumptweet", (
+        Param("text", "Text to TrumpTweet"),
+    )),
+    Endpoint("tweet", (
+        Param("username", "Twitter Username without the @"),
+        Param("text", "Text to tweet")
+    )),
+    Endpoint("deepfry", (
+        Param("image", "Image URL to DeepFry."),
+    )),
+    Endpoint("blurpify", (
+        Param("image", "Image URL to Blurpify."),
+    )),
+    Endpoint("phcomment", (
+        Param("image", "User image URL"),
+        Param("text", "Text to comment."),
+        Param("username", "User’s Username")
+    )),
+    Endpoint("magik", (
+        Param("image", "Image to magikify"),
+        Param("intensity", "an integer of magik intensity from 0 to 10", 5)
+    )),
+    Endpoint("trash", (
+        Param("url", "URL of trash waifu"),
+    ), raw=False),
+    Endpoint("stickbug", (
+        Param("url", "Image url for stickbug"),
+    ), raw=False)
+)}
+
+# Built once, binding arguments is the only per call work
+_signatures = {name: endpoint.signature for name, endpoint in ENDPOINTS.items()}
+
+
+def endpoint_params(name: str, *args, **kwargs) -> typing.Tuple[str, dict]:
+    """
+    Build the request an endpoint method would send, raw images are always requested
+    :param name: Endpoint method name, e.g. "ship"
+    :return: Path and query parameters
+    """
+    endpoint = ENDPOINTS.get(name)
+    if endpoint is None:
+        raise AttributeError("Unknown endpoint {!r}".format(name))
+    path, params = endpoint.request(*args, **kwargs)
+    params["raw"] = "1"
+    return path, params
+
+
+def _method(endpoint: Endpoint, coroutine: bool, returns: typing.Any) -> typing.Callable:
+    request = endpoint.request
+    extra = [
+        inspect.Parameter("resolve", inspect.Parameter.KEYWORD_ONLY, default=False, annotation=bool),
+        inspect.Parameter("timeout", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=float)
+    ]
+    if coroutine:
+        async def method(self, *args, resolve: bool = False, timeout: float = None, priority: str = None,
+                         **kwargs):
+            path, params = request(*args, **kwargs)
+            deadline = self._deadline(path, params, timeout)
+            if resolve:
+                return await self._resolve(endpoint, path, params, deadline=deadline, priority=priority)
+            return await self._request(path, params, deadline=deadline, priority=priority)
+
+        extra.append(inspect.Parameter("priority", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=str))
+        method.__doc__ = endpoint.docstring(":param priority: Scheduler priority class, e.g. interactive or bulk")
+    else:
+        def method(self, *args, resolve: bool = False, timeout: float = None, **kwargs):
+            path, params = request(*args, **kwargs)
+            deadline = self._deadline(path, params, timeout)
+            if resolve:
+                return self._resolve(endpoint, path, params, deadline=deadline)
+            return self._request(path, params, deadline=deadline)
+
+        method.__doc__ = endpoint.docstring()
+
+    signature = _signatures[endpoint.name]
+    method.__name__ = endpoint.name
+    method.__signature__ = signature.replace(
+        parameters=[inspect.Parameter("self", inspect.Parameter.POSITIONAL_OR_KEYWORD)] +
+        list(signature.parameters.values()) + extra,
+        return_annotation=returns
+    )
+    return method
+
+
+def endpoints(cls: type) -> type:
+    """
+    Class decorator adding a method for every endpoint in ENDPOINTS that the class doesn't define itself, methods
+    are coroutines if the class' _request is one
+    """
+    coroutine = inspect.iscoroutinefunction(cls._request)
+    returns = cls._request.__annotations__.get("return", typing.Any)
+    for name, endpoint in ENDPOINTS.items():
+        if name in cls.__dict__:
+            continue
+        method = _method(endpoint, coroutine, returns)
+        method.__qualname__ = "{}.{}".format(cls.__qualname__, name)
+        method.__module__ = cls.__module__
+        setattr(cls, name, method)
+    return cls
@@ -0,0 +1,34 @@
+class NekoBotError(Exception):
+    pass
+
+
+class CircuitOpenError(NekoBotError):
+
+    def __init__(self, route: str, retry_in: float):
+        super().__init__("{} is failing, not sending requests for another {:.1f}s".format(route, retry_in))
+        self.route = route
+        self.retry_in = retry_in
+
+
+class APIError(NekoBotError):
+
+    def __init__(self, status: int, message: str):
+        super().__init__("{}: {}".format(status, message))
+        self.status = status
+        self.message = message
+
+
+class DecodeError(NekoBotError):
+
+    def __init__(self, status: int, content_type: str, body: bytes):
+        super().__init__("Could not decode {} response with status {}".format(content_type or "untyped", status))
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+
+
+class DeadlineExceeded(NekoBotError):
+
+    def __init__(self, route: str):
+        super().__init__("{} did not finish before its deadline".format(route))
+        self.route = route
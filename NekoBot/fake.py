@@ -0,0 +1,257 @@
+from .transport import AsyncTransport, AsyncTransportResponse, Transport, TransportResponse
+import asyncio
+import hashlib
+import http.server
+import json
+import random
+import threading
+import time
+import typing
+import urllib.parse
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+MP4_HEADER = b"\x00\x00\x00\x18ftypmp42"
+# Imagegen types that always answer with the file itself
+VIDEO_TYPES = frozenset({"stickbug"})
+ASSET_LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+class FakeReply(typing.NamedTuple):
+    status: int
+    headers: typing.Dict[str, str]
+    body: bytes
+    delay: float = 0.0
+
+
+class FakeBackend:
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 payload_size: int = 64 * 1024, *, seed: int = None, asset_url: str = "https://fake.nekobot.xyz",
+                 asset_max_age: int = 60):
+        """
+        Emulates the /image and /imagegen endpoints for offline testing and benchmarking
+        :param latency: Base seconds every response is delayed by
+        :param jitter: Max extra random seconds added to latency
+        :param error_rate: Chance from 0 to 1 of answering with a 500
+        :param payload_size: Size in bytes of generated raw images
+        :param seed: Random seed for reproducible runs
+        :param asset_url: Base URL put in JSON messages, assets under it are served by the backend too
+        :param asset_max_age: Cache-Control max-age of assets, they also carry an ETag and Last-Modified and answer
+            matching conditional requests with 304
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.payload_size = payload_size
+        self.asset_url = asset_url
+        self.asset_max_age = asset_max_age
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _payload(self, key: str, header: bytes) -> bytes:
+        seed = hashlib.sha256(key.encode()).digest()
+        body = header + seed * (max(0, self.payload_size - len(header)) // len(seed) + 1)
+        return body[:max(self.payload_size, len(header))]
+
+    @staticmethod
+    def _json(status: int, message: str, success: bool) -> typing.Tuple[int, typing.Dict[str, str], bytes]:
+        body = json.dumps({
+            "message": message,
+            "success": success,
+            "version": "fake",
+            "status": status
+        }).encode()
+        return status, {"Content-Type": "application/json"}, body
+
+    def handle(self, path: str, params: typing.Mapping[str, str],
+               headers: typing.Mapping[str, str] = None) -> FakeReply:
+        """
+        :param path: URL path, matched on its last segment so any BASE_URL prefix works
+        :param params: Query parameters
+        :param headers: Request headers
+        :return: Response to send
+        """
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+            nonce = self._random.getrandbits(64)
+        if failed:
+            body = b"<html><body>Internal Server Error</body></html>"
+            return FakeReply(500, {"Content-Type": "text/html", "Content-Length": str(len(body))}, body, delay)
+        params = {k: str(v) for k, v in params.items()}
+        endpoint = path.rstrip("/").rsplit("/", 1)[-1]
+        image_type = params.get("type", "")
+        if "/assets/" in path:
+            validators = {
+                "ETag": '"{}"'.format(hashlib.sha256(path.encode()).hexdigest()[:16]),
+                "Last-Modified": ASSET_LAST_MODIFIED,
+                "Cache-Control": "public, max-age={}".format(self.asset_max_age)
+            }
+            headers = headers or {}
+            if headers.get("If-None-Match") == validators["ETag"] or \
+                    "If-None-Match" not in headers and headers.get("If-Modified-Since") == ASSET_LAST_MODIFIED:
+                return FakeReply(304, dict(validators, **{"Content-Length": "0"}), b"", delay)
+            header = MP4_HEADER if path.endswith(".mp4") else PNG_HEADER
+            content_type = "video/mp4" if path.endswith(".mp4") else "image/png"
+            status, headers, body = 200, dict(validators, **{"Content-Type": content_type}), \
+                self._payload(path, header)
+        elif endpoint == "image":
+            status, headers, body = self._json(
+                200, "{}/assets/{}/{:016x}.png".format(self.asset_url, image_type, nonce), True
+            )
+        elif endpoint == "imagegen":
+            key = json.dumps(params, sort_keys=True)
+            ext = "mp4" if image_type in VIDEO_TYPES else "png"
+            if params.get("raw") == "1" or image_type in VIDEO_TYPES:
+                header, content_type = (MP4_HEADER, "video/mp4") if ext == "mp4" else (PNG_HEADER, "image/png")
+                status, headers, body = 200, {"Content-Type": content_type}, self._payload(key, header)
+            else:
+                digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+                status, headers, body = self._json(
+                    200, "{}/assets/{}/{}.{}".format(self.asset_url, image_type, digest, ext), True
+                )
+        else:
+            status, headers, body = self._json(404, "Not Found", False)
+        headers["Content-Length"] = str(len(body))
+        return FakeReply(status, headers, body, delay)
+
+
+class FakeResponse(TransportResponse):
+
+    def __init__(self, reply: FakeReply):
+        self.status = reply.status
+        self.reason = http.HTTPStatus(reply.status).phrase
+        self.headers = reply.headers
+        self._body = reply.body
+
+    def read(self) -> bytes:
+        return self._body
+
+    def iter_chunks(self, chunk_size: int) -> typing.Iterator[bytes]:
+        for i in range(0, len(self._body), chunk_size):
+            yield self._body[i:i + chunk_size]
+
+
+class FakeTransport(Transport):
+
+    def __init__(self, backend: FakeBackend = None):
+        """
+        In-memory transport answering from a FakeBackend, no sockets are opened
+        :param backend: Backend to answer with
+        """
+        self.backend = backend or FakeBackend()
+
+    def get(self, url: str, params: dict, headers: dict, *, stream: bool = False,
+            timeout: float = None) -> FakeResponse:
+        reply = self.backend.handle(urllib.parse.urlsplit(url).path, params, headers)
+        if timeout is not None and reply.delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Fake response took longer than {:.3f}s".format(timeout))
+        if reply.delay:
+            time.sleep(reply.delay)
+        return FakeResponse(reply)
+
+    def fork(self) -> "FakeTransport":
+        return self
+
+
+class AsyncFakeResponse(AsyncTransportResponse):
+
+    def __init__(self, reply: FakeReply):
+        self.status = reply.status
+        self.reason = http.HTTPStatus(reply.status).phrase
+        self.headers = reply.headers
+        self._body = reply.body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def iter_chunks(self, chunk_size: int) -> typing.AsyncIterator[bytes]:
+        for i in range(0, len(self._body), chunk_size):
+            yield self._body[i:i + chunk_size]
+
+
+class AsyncFakeTransport(AsyncTransport):
+
+    def __init__(self, backend: FakeBackend = None):
+        """
+        In-memory transport answering from a FakeBackend, no sockets are opened
+        :param backend: Backend to answer with
+        """
+        self.backend = backend or FakeBackend()
+
+    async def get(self, url: str, params: dict, headers: dict) -> AsyncFakeResponse:
+        reply = self.backend.handle(urllib.parse.urlsplit(url).path, params, headers)
+        if reply.delay:
+            await asyncio.sleep(reply.delay)
+        return AsyncFakeResponse(reply)
+
+
+class _FakeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle would hold the body back for a delayed ACK
+    disable_nagle_algorithm = True
+    backend = None
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        reply = self.backend.handle(url.path, dict(urllib.parse.parse_qsl(url.query)), self.headers)
+        if reply.delay:
+            time.sleep(reply.delay)
+        try:
+            self.send_response(reply.status)
+            for name, value in reply.headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(reply.body)
+        except ConnectionError:
+            # The client gave up waiting, e.g. its deadline passed or it was a cancelled hedge
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class _FakeHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 makes connects wait for SYN retries under load
+    request_queue_size = 1024
+
+
+class FakeServer:
+
+    def __init__(self, backend: FakeBackend = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Local HTTP server answering from a FakeBackend on a background thread, point a client at it with
+        client.BASE_URL = server.url
+        :param backend: Backend to answer with, its asset_url is pointed at this server
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 picks a free one
+        """
+        self.backend = backend or FakeBackend()
+        handler = type("FakeHandler", (_FakeHandler,), {"backend": self.backend})
+        self._server = _FakeHTTPServer((host, port), handler)
+        self.root = "http://{}:{}".format(*self._server.server_address[:2])
+        self.url = self.root + "/api"
+        self.backend.asset_url = self.root
+        self._thread = None
+
+    def start(self) -> "FakeServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="nekobot-fake")
+            self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
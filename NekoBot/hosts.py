@@ -0,0 +1,126 @@
+import threading
+import time
+import typing
+
+
+class _Host:
+    __slots__ = ("url", "latency", "error_rate", "failures", "demoted", "last_used", "samples")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.failures = 0
+        self.demoted = False
+        self.last_used = float("-inf")
+        self.samples = 0
+
+
+class HostPool:
+
+    def __init__(self, urls: typing.Iterable[str], *, alpha: float = 0.2, error_weight: float = 10.0,
+                 max_failures: int = 3, probe_interval: float = 10.0, probe_timeout: float = 2.0):
+        """
+        Route requests over several base URLs, e.g. mirrors or regional proxies, to the fastest healthy one.
+        Hosts are scored by an exponentially weighted moving average of their latency and error rate, one instance
+        can be shared between any amount of clients.
+        :param urls: Base URLs used in place of BASE_URL, the first ones are preferred while there are no samples
+        :param alpha: Weight of the newest sample in the moving averages, from 0 to 1
+        :param error_weight: How much the error rate inflates a host's latency score
+        :param max_failures: Consecutive failures that take a host out of rotation
+        :param probe_interval: Seconds after which a demoted host or one without samples gets one request to check
+            on it, healthy hosts are picked by score alone
+        :param probe_timeout: Seconds such a probing request may take while a healthy host with samples is there to
+            fail over to, so a blackholed host can't hang it
+        """
+        self._hosts = [_Host(url.rstrip("/")) for url in urls]
+        if not self._hosts:
+            raise ValueError("HostPool needs at least one URL")
+        self._by_url = {host.url: host for host in self._hosts}
+        self.alpha = alpha
+        self.error_weight = error_weight
+        self.max_failures = max_failures
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    @property
+    def urls(self) -> typing.List[str]:
+        return [host.url for host in self._hosts]
+
+    def _score(self, host: _Host) -> float:
+        if not host.samples:
+            return float("inf")
+        return host.latency * (1 + self.error_weight * host.error_rate)
+
+    def pick(self, exclude: typing.Container[str] = ()) -> str:
+        """
+        :param exclude: URLs already tried for this request
+        :return: Base URL to send the next request to
+        """
+        with self._lock:
+            now = time.monotonic()
+            hosts = [host for host in self._hosts if host.url not in exclude] or self._hosts
+            stale = [host for host in hosts
+                     if (host.demoted or not host.samples) and now - host.last_used >= self.probe_interval]
+            healthy = [host for host in hosts if not host.demoted]
+            if stale:
+                host = min(stale, key=lambda h: h.last_used)
+            elif healthy:
+                host = min(healthy, key=lambda h: (self._score(h), h.last_used))
+            else:
+                host = min(hosts, key=lambda h: h.last_used)
+            host.last_used = now
+            return host.url
+
+    def timeout_for(self, url: str) -> typing.Optional[float]:
+        """
+        :param url: Base URL returned by pick()
+        :return: probe_timeout if the host is only being checked on and a known healthy host can take over, else None
+        """
+        with self._lock:
+            host = self._by_url[url]
+            if host.samples and not host.demoted:
+                return None
+            if any(other.samples and not other.demoted for other in self._hosts):
+                return self.probe_timeout
+            return None
+
+    def record(self, url: str, elapsed: float, ok: bool):
+        """
+        Feed the outcome of a request into the host's score
+        :param url: Base URL returned by pick()
+        :param elapsed: Seconds until the response arrived or the request failed
+        :param ok: False for connection errors and 5xx responses
+        """
+        with self._lock:
+            host = self._by_url[url]
+            host.samples += 1
+            if host.samples == 1:
+                host.latency = elapsed
+            else:
+                host.latency += self.alpha * (elapsed - host.latency)
+            host.error_rate += self.alpha * ((0.0 if ok else 1.0) - host.error_rate)
+            if ok:
+                host.failures = 0
+                host.demoted = False
+            else:
+                host.failures += 1
+                if host.failures >= self.max_failures:
+                    host.demoted = True
+
+    def stats(self) -> typing.List[dict]:
+        """
+        :return: Per host scores, best first
+        """
+        with self._lock:
+            return [{
+                "url": host.url,
+                "latency": host.latency,
+                "error_rate": host.error_rate,
+                "samples": host.samples,
+                "demoted": host.demoted
+            } for host in sorted(self._hosts, key=lambda h: (h.demoted, self._score(h)))]
@@ -0,0 +1,145 @@
+from .ratelimit import parse_retry_after
+import threading
+import time
+import typing
+
+STRATEGIES = ("round_robin", "least_loaded")
+
+
+def _number(value: typing.Optional[str]) -> typing.Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Key:
+    __slots__ = ("token", "weight", "current", "in_flight", "remaining", "reset_at", "benched_until", "requests",
+                 "rejected")
+
+    def __init__(self, token: str, weight: float):
+        self.token = token
+        self.weight = weight
+        # Smooth weighted round robin state
+        self.current = 0.0
+        self.in_flight = 0
+        self.remaining = None
+        self.reset_at = 0.0
+        self.benched_until = 0.0
+        self.requests = 0
+        self.rejected = 0
+
+
+class KeyPool:
+
+    def __init__(self, keys: typing.Union[typing.Mapping[str, float], typing.Iterable[typing.Union[str, tuple]]], *,
+                 strategy: str = "round_robin", cooldown: float = 60.0):
+        """
+        Spread requests over several API tokens, one instance can be shared between any amount of clients
+        :param keys: Tokens, (token, weight) tuples or a mapping of token to weight, weights default to 1
+        :param strategy: round_robin sends each key a share of requests proportional to its weight, least_loaded
+            picks the key with the fewest requests in flight per weight and skips keys the X-RateLimit-Remaining
+            header says are used up
+        :param cooldown: Seconds a key rejected with 401/403, or with 429 and no Retry-After, is left out for
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError("strategy must be one of {}".format(", ".join(STRATEGIES)))
+        if isinstance(keys, typing.Mapping):
+            keys = keys.items()
+        self._keys = {}
+        for key in keys:
+            token, weight = (key, 1.0) if isinstance(key, str) else key
+            if weight <= 0:
+                raise ValueError("Key weights must be positive")
+            self._keys[token] = _Key(token, float(weight))
+        if not self._keys:
+            raise ValueError("KeyPool needs at least one key")
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _available(self, key: _Key, now: float) -> bool:
+        if key.benched_until > now:
+            return False
+        if key.remaining is not None and key.remaining - key.in_flight <= 0:
+            if key.reset_at > now:
+                return False
+            key.remaining = None
+        return True
+
+    def acquire(self) -> str:
+        """
+        Pick a key for a request, has to be handed back with release()
+        :return: Token to authorize with, the key that recovers first if every key is out of rotation
+        """
+        with self._lock:
+            now = time.monotonic()
+            keys = [key for key in self._keys.values() if self._available(key, now)]
+            if not keys:
+                key = min(self._keys.values(), key=lambda k: max(k.benched_until, k.reset_at))
+            elif self.strategy == "least_loaded":
+                key = min(keys, key=lambda k: (k.in_flight / k.weight,
+                                               -(k.remaining if k.remaining is not None else float("inf"))))
+            else:
+                total = 0.0
+                for k in keys:
+                    k.current += k.weight
+                    total += k.weight
+                key = max(keys, key=lambda k: k.current)
+                key.current -= total
+            key.in_flight += 1
+            key.requests += 1
+            return key.token
+
+    def release(self, token: str, status: int = None, headers: typing.Mapping[str, str] = None) -> bool:
+        """
+        Hand a key back and feed its response into the pool
+        :param token: Token returned by acquire()
+        :param status: HTTP status, None if the request failed without a response
+        :param headers: Response headers
+        :return: True if the key was taken out of rotation and the request should be sent again with another one
+        """
+        with self._lock:
+            key = self._keys[token]
+            key.in_flight -= 1
+            if status is None:
+                return False
+            now = time.monotonic()
+            headers = headers or {}
+            remaining = _number(headers.get("X-RateLimit-Remaining"))
+            reset = _number(headers.get("X-RateLimit-Reset"))
+            if reset is not None:
+                # Either seconds left or a unix timestamp
+                key.reset_at = now + (reset - time.time() if reset > 1e9 else reset)
+            if remaining is not None:
+                key.remaining = remaining
+            if status == 429:
+                delay = parse_retry_after(headers.get("Retry-After"))
+                if delay is None:
+                    delay = key.reset_at - now if key.reset_at > now else self.cooldown
+                key.benched_until = now + delay
+            elif status in (401, 403):
+                key.benched_until = now + self.cooldown
+            else:
+                return False
+            key.rejected += 1
+            return len(self._keys) > 1
+
+    def stats(self) -> typing.List[dict]:
+        """
+        :return: Per key counters, tokens are shortened
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [{
+                "key": key.token[:6] + "...",
+                "weight": key.weight,
+                "requests": key.requests,
+                "rejected": key.rejected,
+                "in_flight": key.in_flight,
+                "remaining": key.remaining,
+                "available": self._available(key, now)
+            } for key in self._keys.values()]
@@ -0,0 +1,232 @@
+from .cache import endpoint_name
+import bisect
+import collections
+import threading
+import time
+import typing
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the +Inf bucket, not cumulative
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> typing.Optional[float]:
+        """
+        Estimate a quantile by interpolating inside the bucket it falls in
+        :param q: Quantile from 0 to 1
+        :return: Estimated value or None without observations
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class _Tracker:
+    __slots__ = ("metrics", "endpoint", "started", "discarded")
+
+    def __init__(self, metrics: "Metrics", endpoint: str):
+        self.metrics = metrics
+        self.endpoint = endpoint
+        self.started = 0.0
+        self.discarded = False
+
+    def __enter__(self) -> "_Tracker":
+        with self.metrics._lock:
+            self.metrics.in_flight[self.endpoint] += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        metrics = self.metrics
+        with metrics._lock:
+            metrics.in_flight[self.endpoint] -= 1
+            if self.discarded:
+                return
+            histogram = metrics.latency.get(self.endpoint)
+            if histogram is None:
+                histogram = metrics.latency[self.endpoint] = Histogram(metrics.buckets)
+            histogram.observe(elapsed)
+            if exc_type is not None:
+                metrics.errors[(self.endpoint, exc_type.__name__)] += 1
+
+    def done(self, status: int, size: int):
+        """
+        Record the response of a finished request
+        :param status: HTTP status
+        :param size: Body size in bytes
+        """
+        with self.metrics._lock:
+            self.metrics.requests[(self.endpoint, status)] += 1
+            self.metrics.bytes[self.endpoint] += size
+
+    def parse_failed(self):
+        with self.metrics._lock:
+            self.metrics.parse_failures[self.endpoint] += 1
+
+    def discard(self):
+        """
+        Leave the request out of latency and error counts, e.g. a hedge attempt that was cancelled
+        """
+        self.discarded = True
+
+
+class _NullTracker:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTracker":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def done(self, status: int, size: int):
+        pass
+
+    def parse_failed(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+NULL_TRACKER = _NullTracker()
+
+
+def _labels(**labels) -> str:
+    return ",".join('{}="{}"'.format(
+        k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    ) for k, v in labels.items())
+
+
+class Metrics:
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Per endpoint request metrics, endpoints are imagegen types or the path for other requests.
+        One instance can be shared between clients.
+        :param buckets: Latency histogram bucket upper bounds in seconds
+        """
+        self.buckets = tuple(buckets)
+        self.latency = {}
+        self.in_flight = collections.Counter()
+        self.requests = collections.Counter()
+        self.bytes = collections.Counter()
+        self.parse_failures = collections.Counter()
+        self.errors = collections.Counter()
+        self._lock = threading.Lock()
+
+    def track(self, path: str, params: dict) -> _Tracker:
+        """
+        Track one request, use as a context manager around it
+        :param path: API path
+        :param params: Query parameters
+        """
+        return _Tracker(self, endpoint_name(path, params))
+
+    def quantile(self, endpoint: str, q: float) -> typing.Optional[float]:
+        """
+        :param endpoint: Imagegen type or path
+        :param q: Quantile from 0 to 1
+        :return: Estimated latency in seconds or None without observations
+        """
+        with self._lock:
+            histogram = self.latency.get(endpoint)
+            return histogram.quantile(q) if histogram is not None else None
+
+    def snapshot(self) -> dict:
+        """
+        :return: Current metrics by endpoint
+        """
+        endpoints = {}
+
+        def entry(name: str) -> dict:
+            if name not in endpoints:
+                endpoints[name] = {
+                    "requests": 0,
+                    "statuses": {},
+                    "errors": {},
+                    "bytes": 0,
+                    "parse_failures": 0,
+                    "in_flight": 0,
+                    "latency": None
+                }
+            return endpoints[name]
+
+        with self._lock:
+            for (name, status), count in self.requests.items():
+                entry(name)["requests"] += count
+                entry(name)["statuses"][status] = count
+            for (name, error), count in self.errors.items():
+                entry(name)["errors"][error] = count
+            for name, count in self.bytes.items():
+                entry(name)["bytes"] = count
+            for name, count in self.parse_failures.items():
+                entry(name)["parse_failures"] = count
+            for name, count in self.in_flight.items():
+                entry(name)["in_flight"] = count
+            for name, histogram in self.latency.items():
+                entry(name)["latency"] = {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "p99": histogram.quantile(0.99)
+                }
+        return endpoints
+
+    def to_prometheus(self, prefix: str = "nekobot") -> str:
+        """
+        :param prefix: Metric name prefix
+        :return: Metrics in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            name = prefix + "_request_duration_seconds"
+            lines.append("# HELP {} Request latency in seconds.".format(name))
+            lines.append("# TYPE {} histogram".format(name))
+            for endpoint, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append("{}_bucket{{{}}} {}".format(name, _labels(endpoint=endpoint, le=bound), cumulative))
+                lines.append("{}_sum{{{}}} {}".format(name, _labels(endpoint=endpoint), histogram.sum))
+                lines.append("{}_count{{{}}} {}".format(name, _labels(endpoint=endpoint), histogram.count))
+            for metric, kind, help_text, values, label_names in (
+                ("requests_total", "counter", "Responses by status code.", self.requests, ("endpoint", "status")),
+                ("errors_total", "counter", "Requests that raised, by exception type.", self.errors,
+                 ("endpoint", "error")),
+                ("response_bytes_total", "counter", "Response body bytes received.", self.bytes, ("endpoint",)),
+                ("parse_failures_total", "counter", "JSON responses that could not be decoded.",
+                 self.parse_failures, ("endpoint",)),
+                ("requests_in_flight", "gauge", "Requests currently running.", self.in_flight, ("endpoint",))
+            ):
+                name = "{}_{}".format(prefix, metric)
+                lines.append("# HELP {} {}".format(name, help_text))
+                lines.append("# TYPE {} {}".format(name, kind))
+                for key, value in sorted(values.items(), key=lambda item: str(item[0])):
+                    key = key if isinstance(key, tuple) else (key,)
+                    lines.append("{}{{{}}} {}".format(name, _labels(**dict(zip(label_names, key))), value))
+        return "\n".join(lines) + "\n"
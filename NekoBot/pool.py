@@ -0,0 +1,77 @@
+from .base import Call
+from .client import NekoBot
+import concurrent.futures
+import threading
+import typing
+
+
+class NekoBotPool:
+
+    def __init__(self, authorization: str = "", *, workers: int = 8, **options):
+        """
+        Run NekoBot calls on a thread pool, every worker thread gets its own NekoBot and requests.Session
+        :param authorization: API token
+        :param workers: Amount of worker threads
+        :param options: Keyword arguments passed to every NekoBot, caches, rate limiters and circuit breakers
+            given here are shared between all workers, a transport is forked for each worker
+        """
+        self.authorization = authorization
+        self.options = options
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="nekobot")
+        self._local = threading.local()
+        self._clients = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "NekoBotPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _client(self) -> NekoBot:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            options = dict(self.options)
+            if options.get("transport") is not None:
+                options["transport"] = options["transport"].fork()
+            client = self._local.client = NekoBot(self.authorization, **options)
+            with self._lock:
+                self._clients.append(client)
+        return client
+
+    def _call(self, name: str, args: tuple, kwargs: dict) -> typing.Any:
+        return getattr(self._client(), name)(*args, **kwargs)
+
+    def submit(self, name: str, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Schedule an endpoint call, e.g. pool.submit("ship", url1, url2, raw=True)
+        :param name: NekoBot method name
+        :return: Future for the call result
+        """
+        return self._executor.submit(self._call, name, args, kwargs)
+
+    def batch(self, calls: typing.Iterable[typing.Union[Call, tuple]]) -> typing.List[concurrent.futures.Future]:
+        """
+        Schedule many endpoint calls
+        :param calls: Call or (name, args, kwargs) tuples
+        :return: Futures in the same order as calls
+        """
+        return [self._executor.submit(self._call, *Call(*call)) for call in calls]
+
+    def map(self, name: str, *iterables, timeout: float = None, **kwargs) -> typing.Iterator[typing.Any]:
+        """
+        Call one endpoint for every set of arguments, e.g. pool.map("clyde", texts)
+        :param name: NekoBot method name
+        :param iterables: Positional arguments, zipped together like the builtin map
+        :param timeout: Seconds to wait for all results
+        :param kwargs: Keyword arguments passed to every call
+        :return: Iterator of results in argument order, the first failed call raises when reached
+        """
+        return self._executor.map(lambda args: self._call(name, args, kwargs), zip(*iterables), timeout=timeout)
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
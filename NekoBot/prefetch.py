@@ -0,0 +1,195 @@
+import queue
+import threading
+import typing
+
+if typing.TYPE_CHECKING:
+    from .client import Response
+
+RETRY_DELAY = 1.0
+
+
+class _Pool:
+    __slots__ = ("queue", "drained", "worker")
+
+    def __init__(self, items, drained, worker=None):
+        self.queue = items
+        self.drained = drained
+        self.worker = worker
+
+
+class ImagePrefetcher:
+
+    def __init__(self, client, low: int = 2, high: int = 8):
+        """
+        Keep a queue of already fetched get_image results per image type, filled by a background thread
+        :param client: NekoBot used only by the prefetch threads, its session is not shared with other threads
+        :param low: Refill once a queue has this many images or less
+        :param high: Max images kept per type
+        """
+        self.client = client
+        self.low = low
+        self.high = high
+        self._pools = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, image_type: str):
+        """
+        Start prefetching an image type, does nothing if it is already being prefetched
+        :param image_type: https://docs.nekobot.xyz/#image-endpoints-image
+        """
+        with self._lock:
+            if image_type in self._pools:
+                return
+            pool = self._pools[image_type] = _Pool(queue.Queue(), threading.Event())
+            pool.worker = threading.Thread(target=self._fill, args=(image_type, pool), daemon=True,
+                                           name="nekobot-prefetch-{}".format(image_type))
+            pool.worker.start()
+
+    def __contains__(self, image_type: str) -> bool:
+        return image_type in self._pools
+
+    def _fill(self, image_type: str, pool: _Pool):
+        while not self._stop.is_set():
+            if pool.queue.qsize() >= self.high:
+                pool.drained.wait()
+                pool.drained.clear()
+                continue
+            try:
+                image = self.client._request("/image", {"type": image_type})
+            except Exception:
+                self._stop.wait(RETRY_DELAY)
+                continue
+            if getattr(image, "success", False):
+                pool.queue.put(image)
+            else:
+                self._stop.wait(RETRY_DELAY)
+
+    def get(self, image_type: str, block: bool = True, timeout: float = None) -> typing.Optional["Response"]:
+        """
+        Take a prefetched image, prefetching starts for the type if it hasn't yet
+        :param image_type: Image type
+        :param block: Wait for an image if the queue is empty
+        :param timeout: Max seconds to wait
+        :return: Response or None if none was ready in time
+        """
+        self.start(image_type)
+        pool = self._pools[image_type]
+        try:
+            image = pool.queue.get(block, timeout)
+        except queue.Empty:
+            image = None
+        if pool.queue.qsize() <= self.low:
+            pool.drained.set()
+        return image
+
+    def iter(self, image_type: str) -> typing.Iterator["Response"]:
+        """
+        :param image_type: Image type
+        :return: Endless iterator of prefetched images
+        """
+        while not self._stop.is_set():
+            yield self.get(image_type)
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            for pool in self._pools.values():
+                pool.drained.set()
+        self.client.close()
+
+
+class AsyncImagePrefetcher:
+
+    def __init__(self, client, low: int = 2, high: int = 8):
+        """
+        Keep a queue of already fetched get_image results per image type, filled by a background task
+        :param client: NekoBotAsync to fetch with
+        :param low: Refill once a queue has this many images or less
+        :param high: Max images kept per type
+        """
+        self.client = client
+        self.low = low
+        self.high = high
+        self._pools = {}
+
+    def start(self, image_type: str):
+        """
+        Start prefetching an image type, does nothing if it is already being prefetched
+        :param image_type: https://docs.nekobot.xyz/#image-endpoints-image
+        """
+        # asyncio is imported in the methods so the sync client doesn't pull it in
+        import asyncio
+
+        if image_type in self._pools:
+            return
+        pool = self._pools[image_type] = _Pool(asyncio.Queue(), asyncio.Event())
+        pool.worker = asyncio.ensure_future(self._fill(image_type, pool))
+
+    def __contains__(self, image_type: str) -> bool:
+        return image_type in self._pools
+
+    async def _fill(self, image_type: str, pool: _Pool):
+        import asyncio
+
+        while True:
+            if pool.queue.qsize() >= self.high:
+                await pool.drained.wait()
+                pool.drained.clear()
+                continue
+            try:
+                image = await self.client._request("/image", {"type": image_type})
+            except Exception:
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            if getattr(image, "success", False):
+                pool.queue.put_nowait(image)
+            else:
+                await asyncio.sleep(RETRY_DELAY)
+
+    def get_nowait(self, image_type: str) -> typing.Optional["Response"]:
+        """
+        Take a prefetched image if one is ready, prefetching starts for the type if it hasn't yet
+        :param image_type: Image type
+        :return: Response or None
+        """
+        import asyncio
+
+        self.start(image_type)
+        pool = self._pools[image_type]
+        try:
+            image = pool.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            image = None
+        if pool.queue.qsize() <= self.low:
+            pool.drained.set()
+        return image
+
+    async def get(self, image_type: str) -> "Response":
+        """
+        Take a prefetched image, waiting for one if the queue is empty
+        :param image_type: Image type
+        :return: Response
+        """
+        self.start(image_type)
+        pool = self._pools[image_type]
+        image = await pool.queue.get()
+        if pool.queue.qsize() <= self.low:
+            pool.drained.set()
+        return image
+
+    async def iter(self, image_type: str) -> typing.AsyncIterator["Response"]:
+        """
+        :param image_type: Image type
+        :return: Endless async iterator of prefetched images
+        """
+        while True:
+            yield await self.get(image_type)
+
+    async def close(self):
+        import asyncio
+
+        for pool in self._pools.values():
+            pool.worker.cancel()
+        await asyncio.gather(*(pool.worker for pool in self._pools.values()), return_exceptions=True)
+        self._pools.clear()
@@ -0,0 +1,170 @@
+from .cache import endpoint_name
+from .errors import DeadlineExceeded
+import email.utils
+import threading
+import time
+import typing
+
+
+def parse_retry_after(value: typing.Optional[str]) -> typing.Optional[float]:
+    """
+    Parse a Retry-After header
+    :param value: Header value, either seconds or an HTTP date
+    :return: Seconds to wait or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "postponed")
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        :param rate: Tokens added per second
+        :param capacity: Max tokens, the allowed burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        # Total seconds reservations were pushed back by pauses
+        self.postponed = 0.0
+
+    def reserve(self, now: float) -> float:
+        """
+        Take a token, going into debt if none are left so callers queue up behind each other
+        :param now: Current monotonic time
+        :return: Seconds to wait before the token may be used
+        """
+        self._refill(now)
+        self.tokens -= 1
+        return (self.updated - now) + max(0.0, -self.tokens / self.rate)
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def pause(self, until: float, now: float):
+        """
+        Stop handing out usable tokens until the given time, outstanding reservations keep their order and are
+        pushed back by the pause so they still go out at the configured rate after it
+        :param until: Monotonic time to resume at
+        :param now: Current monotonic time
+        """
+        self._refill(now)
+        if until > self.updated:
+            self.postponed += until - self.updated
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = until
+
+
+class RateLimiter:
+
+    def __init__(self, rate: float = 5.0, burst: int = 5, *,
+                 limits: typing.Dict[str, typing.Tuple[float, int]] = None, max_retries: int = 3):
+        """
+        Per route token bucket rate limiter, one instance can be shared between any amount of clients
+        :param rate: Default requests per second for each route
+        :param burst: Default burst size for each route
+        :param limits: (rate, burst) overrides by path or imagegen type, types get their own bucket
+        :param max_retries: Times a request rejected with 429 is sent again after waiting out Retry-After
+        """
+        self.rate = rate
+        self.burst = burst
+        self.limits = dict(limits or {})
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _route(self, path: str, params: dict) -> str:
+        name = endpoint_name(path, params)
+        return name if name in self.limits else path
+
+    def _bucket(self, route: str) -> TokenBucket:
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            rate, burst = self.limits.get(route, (self.rate, self.burst))
+            bucket = self._buckets[route] = TokenBucket(rate, burst)
+        return bucket
+
+    def reserve(self, path: str, params: dict) -> float:
+        """
+        Reserve a slot for a request
+        :param path: API path
+        :param params: Query parameters
+        :return: Seconds to wait before sending
+        """
+        return self._reserve(path, params)[0]
+
+    def _reserve(self, path: str, params: dict) -> typing.Tuple[float, float]:
+        with self._lock:
+            bucket = self._bucket(self._route(path, params))
+            return bucket.reserve(time.monotonic()), bucket.postponed
+
+    def _postponed(self, path: str, params: dict, since: float) -> typing.Tuple[float, float]:
+        # Seconds a reservation was pushed back by pauses after it was made
+        with self._lock:
+            postponed = self._bucket(self._route(path, params)).postponed
+        return postponed - since, postponed
+
+    def paused_for(self, path: str, params: dict) -> float:
+        """
+        :return: Seconds left on a Retry-After pause for the route
+        """
+        with self._lock:
+            return max(0.0, self._bucket(self._route(path, params)).updated - time.monotonic())
+
+    def acquire(self, path: str, params: dict, deadline: float = None):
+        """
+        Block the current thread until the request may be sent
+        :param deadline: time.monotonic() by which the request has to be sent, None waits as long as needed
+        :raises DeadlineExceeded: The request can't be sent before the deadline, raised without waiting
+        """
+        delay, postponed = self._reserve(path, params)
+        while delay > 0:
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise DeadlineExceeded(path)
+            time.sleep(delay)
+            # A Retry-After pause since the reservation pushed it back
+            delay, postponed = self._postponed(path, params, postponed)
+
+    async def acquire_async(self, path: str, params: dict):
+        """
+        Wait without blocking the event loop until the request may be sent
+        """
+        # Imported here so sync only users don't pay for importing asyncio
+        import asyncio
+
+        delay, postponed = self._reserve(path, params)
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay, postponed = self._postponed(path, params, postponed)
+
+    def observe(self, path: str, params: dict, status: int, headers: typing.Mapping[str, str]) -> bool:
+        """
+        Feed a response back into the limiter, a 429 pauses the route for Retry-After seconds
+        :param path: API path
+        :param params: Query parameters
+        :param status: HTTP status code
+        :param headers: Response headers
+        :return: True if the request was rate limited
+        """
+        if status != 429:
+            return False
+        delay = parse_retry_after(headers.get("Retry-After"))
+        with self._lock:
+            bucket = self._bucket(self._route(path, params))
+            now = time.monotonic()
+            bucket.pause(now + (delay if delay is not None else 1 / bucket.rate), now)
+        return True
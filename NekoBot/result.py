@@ -0,0 +1,169 @@
+import hashlib
+import os
+import typing
+
+# Magic bytes to MIME type, checked in order
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"RIFF", "image/webp"),
+    (b"\x1aE\xdf\xa3", "video/webm")
+)
+
+
+def sniff_mime(view: memoryview) -> typing.Optional[str]:
+    """
+    Guess the MIME type of an image or video from its first bytes
+    :param view: Data to check
+    :return: MIME type or None if unknown
+    """
+    head = bytes(view[:16])
+    for signature, mime in SIGNATURES:
+        if head.startswith(signature):
+            if mime == "image/webp" and head[8:12] != b"WEBP":
+                continue
+            return mime
+    if head[4:8] == b"ftyp":
+        return "video/mp4"
+    return None
+
+
+class BaseImageResult:
+    """
+    Status, headers and helpers shared by ImageResult and MappedImageResult, use it for isinstance checks
+    """
+    __slots__ = ()
+    status: int
+    headers: typing.Mapping[str, str]
+
+    @property
+    def view(self) -> memoryview:
+        """
+        Zero-copy view of the image
+        """
+        raise NotImplementedError()
+
+    @property
+    def digest(self) -> str:
+        """
+        SHA-256 hex digest of the image, computed on first access
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.view).hexdigest()
+        return self._digest
+
+    @property
+    def mime_type(self) -> str:
+        """
+        MIME type sniffed from the image bytes, falls back to the Content-Type header
+        """
+        if self._mime is None:
+            self._mime = sniff_mime(self.view) or \
+                self.headers.get("Content-Type", "application/octet-stream").split(";")[0].strip()
+        return self._mime
+
+    def save(self, sink: typing.Union[str, os.PathLike, typing.BinaryIO]) -> int:
+        """
+        Write the image to a file without copying it first
+        :param sink: File path or binary file-like object
+        :return: Bytes written
+        """
+        if isinstance(sink, (str, os.PathLike)):
+            with open(sink, "wb") as f:
+                f.write(self.view)
+        else:
+            sink.write(self.view)
+        return self.view.nbytes
+
+    def tobytes(self) -> bytes:
+        return bytes(self.view)
+
+    def __repr__(self) -> str:
+        return "<{} status={} mime_type={} size={}>".format(type(self).__name__, self.status, self.mime_type,
+                                                            self.view.nbytes)
+
+
+class ImageResult(BaseImageResult, bytes):
+    """
+    Raw image returned by endpoints with raw=True. It is a bytes subclass so it works anywhere bytes do, e.g.
+    io.BytesIO(result), and carries the response status and headers. Building one copies the body once and the
+    metadata lives in an instance dict, bytes subclasses can't own a foreign buffer or declare non-empty __slots__
+    """
+
+    def __new__(cls, data: typing.Any, status: int = 200, headers: typing.Mapping[str, str] = None):
+        """
+        :param data: Image bytes or any object supporting the buffer protocol
+        :param status: HTTP status
+        :param headers: Response headers
+        """
+        self = super().__new__(cls, data)
+        self.status = status
+        self.headers = headers if headers is not None else {}
+        self._digest = None
+        self._mime = None
+        return self
+
+    @property
+    def data(self) -> bytes:
+        return self
+
+    @property
+    def view(self) -> memoryview:
+        return memoryview(self)
+
+    def __getnewargs__(self) -> tuple:
+        return bytes(self), self.status, self.headers
+
+    __repr__ = __str__ = BaseImageResult.__repr__
+
+
+class MappedImageResult(BaseImageResult):
+    __slots__ = ("data", "status", "headers", "_digest", "_mime")
+
+    def __init__(self, data: typing.Any, status: int = 200, headers: typing.Mapping[str, str] = None):
+        """
+        Image served from a memory-mapped file by DiskCache.get_mapped, wraps the buffer without copying it. Before
+        Python 3.12 it isn't bytes-like itself, pass result.view where a buffer is needed
+        :param data: Any object supporting the buffer protocol, e.g. mmap
+        :param status: HTTP status
+        :param headers: Response headers
+        """
+        self.data = data
+        self.status = status
+        self.headers = headers if headers is not None else {}
+        self._digest = None
+        self._mime = None
+
+    @property
+    def view(self) -> memoryview:
+        return memoryview(self.data)
+
+    def __bytes__(self) -> bytes:
+        return self.tobytes()
+
+    def __buffer__(self, flags: int) -> memoryview:
+        return memoryview(self.data)
+
+    def __len__(self) -> int:
+        return self.view.nbytes
+
+    def __getitem__(self, item):
+        value = self.view[item]
+        return value.tobytes() if isinstance(value, memoryview) else value
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self.view)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, BaseImageResult):
+            other = other.view
+        try:
+            return self.view == memoryview(other)
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self) -> int:
+        # Hashing the bytes would copy the whole image, equal images have equal digests
+        return hash(self.digest)
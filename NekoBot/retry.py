@@ -0,0 +1,105 @@
+from .errors import CircuitOpenError
+import random
+import threading
+import time
+import typing
+
+
+class RetryPolicy:
+
+    def __init__(self, max_retries: int = 3, backoff: float = 0.5, max_backoff: float = 10.0, *,
+                 statuses: typing.Iterable[int] = (500, 502, 503, 504)):
+        """
+        Retry failed requests with capped exponential backoff and full jitter, every API call is a GET so all are safe
+        to repeat
+        :param max_retries: Retries after the first attempt
+        :param backoff: Base delay in seconds, doubled every retry
+        :param max_backoff: Upper bound for a single delay
+        :param statuses: HTTP statuses that are retried
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+
+    def delay(self, attempt: int) -> float:
+        """
+        :param attempt: Retry number, starting at 1
+        :return: Seconds to wait before the retry
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+class _Circuit:
+    __slots__ = ("failures", "opened", "probing")
+
+    def __init__(self):
+        self.failures = 0
+        self.opened = None
+        self.probing = False
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Per path circuit breaker, after enough consecutive failures requests fail fast until reset_timeout passes,
+        then a single request is let through to check if the endpoint recovered
+        :param failure_threshold: Consecutive failures that open the circuit
+        :param reset_timeout: Seconds the circuit stays open
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, route: str) -> _Circuit:
+        circuit = self._circuits.get(route)
+        if circuit is None:
+            circuit = self._circuits[route] = _Circuit()
+        return circuit
+
+    def allow(self, route: str):
+        """
+        Check a request may be sent
+        :param route: API path
+        :raises CircuitOpenError: The route is failing
+        """
+        with self._lock:
+            circuit = self._circuit(route)
+            if circuit.opened is None:
+                return
+            now = time.monotonic()
+            retry_in = circuit.opened + self.reset_timeout - now
+            if retry_in > 0:
+                raise CircuitOpenError(route, retry_in)
+            # Restart the window so only this probe goes through, another one is let through if it never reports back
+            circuit.opened = now
+            circuit.probing = True
+
+    def record_success(self, route: str):
+        with self._lock:
+            circuit = self._circuit(route)
+            circuit.failures = 0
+            circuit.opened = None
+            circuit.probing = False
+
+    def record_failure(self, route: str):
+        with self._lock:
+            circuit = self._circuit(route)
+            circuit.failures += 1
+            if circuit.probing or circuit.failures >= self.failure_threshold:
+                circuit.opened = time.monotonic()
+                circuit.probing = False
+
+    def state(self, route: str) -> str:
+        """
+        :return: closed, open or half-open
+        """
+        with self._lock:
+            circuit = self._circuit(route)
+            if circuit.opened is None:
+                return "closed"
+            if circuit.probing or circuit.opened + self.reset_timeout <= time.monotonic():
+                return "half-open"
+            return "open"
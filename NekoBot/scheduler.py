@@ -0,0 +1,106 @@
+import heapq
+import itertools
+import typing
+
+DEFAULT_WEIGHTS = {
+    "interactive": 8.0,
+    "normal": 4.0,
+    "bulk": 1.0
+}
+
+
+class _Slot:
+    __slots__ = ("scheduler", "priority")
+
+    def __init__(self, scheduler: "PriorityScheduler", priority: typing.Optional[str]):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    async def __aenter__(self):
+        await self.scheduler.acquire(self.priority)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler.release()
+
+
+class PriorityScheduler:
+
+    def __init__(self, limit: int = 16, weights: typing.Mapping[str, float] = None, *, default: str = "normal"):
+        """
+        Limits requests in flight and queues the rest by priority class, classes share the slots in proportion to
+        their weights so low priority work still moves while it only uses spare capacity. One instance can be shared
+        between NekoBotAsync clients on the same event loop.
+        :param limit: Max requests in flight across all classes
+        :param weights: Weight by priority class name, defaults to interactive 8, normal 4 and bulk 1
+        :param default: Class of calls made without a priority
+        """
+        self.limit = limit
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        if default not in self.weights:
+            raise ValueError("Default priority {!r} has no weight".format(default))
+        self.default = default
+        self.in_flight = 0
+        # Weighted fair queuing, waiters are served by virtual finish time
+        self._queue = []
+        self._finish = dict.fromkeys(self.weights, 0.0)
+        self._virtual = 0.0
+        self._order = itertools.count()
+
+    def slot(self, priority: str = None) -> _Slot:
+        """
+        Hold a slot for one request, use as an async context manager
+        :param priority: Priority class, None for the default one
+        """
+        return _Slot(self, priority)
+
+    async def acquire(self, priority: str = None):
+        """
+        Wait for a slot, has to be handed back with release()
+        :param priority: Priority class, None for the default one
+        """
+        import asyncio
+
+        priority = priority or self.default
+        weight = self.weights.get(priority)
+        if weight is None:
+            raise ValueError("Unknown priority {!r}".format(priority))
+        if self.in_flight < self.limit and not self._queue:
+            self.in_flight += 1
+            return
+        finish = max(self._virtual, self._finish[priority]) + 1 / weight
+        self._finish[priority] = finish
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (finish, next(self._order), priority, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation, pass it on
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+
+    def release(self):
+        """
+        Hand a slot back, it goes to the waiter with the earliest virtual finish time
+        """
+        while self._queue:
+            finish, _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+            self._virtual = finish
+            waiter.set_result(None)
+            return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        queued = dict.fromkeys(self.weights, 0)
+        for _, _, priority, waiter in self._queue:
+            if not waiter.done():
+                queued[priority] += 1
+        return {
+            "in_flight": self.in_flight,
+            "limit": self.limit,
+            "queued": queued
+        }
@@ -0,0 +1,197 @@
+from .base import Response
+from .cache import BaseCache, endpoint_name, make_key
+from .result import BaseImageResult, ImageResult
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing
+
+# Kinds of stored values
+_RESPONSE = 0
+_RAW = 1
+# Fraction of the TTL a hit's recency may lag behind before it is written back, other hits stay read-only so
+# lookups don't queue on the write lock
+_TOUCH_AFTER = 0.1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS total (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO total VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE total SET bytes = bytes + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE total SET bytes = bytes - old.size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE total SET bytes = bytes - old.size;
+END;
+"""
+
+
+class SharedCache(BaseCache):
+
+    def __init__(self, filename: str, max_bytes: int = 256 * 1024 * 1024, ttl: float = 300.0, *,
+                 ttls: typing.Dict[str, float] = None, paths: typing.Iterable[str] = ("/imagegen",),
+                 timeout: float = 5.0):
+        """
+        SQLite backed cache of JSON responses and raw images that every process on one host can share, the database
+        runs in WAL mode so readers don't block the writer
+        :param filename: Database file, created if missing
+        :param max_bytes: Byte budget for stored values, expired and then least recently used entries are evicted
+        :param ttl: Default seconds a result stays valid
+        :param ttls: TTL overrides by endpoint name (imagegen type), 0 disables caching for that endpoint
+        :param paths: API paths that are cached
+        :param timeout: Seconds to wait for another process holding the write lock, lookups that time out count as
+            misses and stores are dropped
+        """
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.paths = frozenset(paths)
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._pid = None
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections can't be carried over a fork, children open their own
+        if self._pid != os.getpid():
+            db = sqlite3.connect(self.filename, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+            self._pid = os.getpid()
+        return self._db
+
+    def ttl_for(self, path: str, params: dict) -> float:
+        return self.ttls.get(endpoint_name(path, params), self.ttl)
+
+    def cacheable(self, path: str, params: dict) -> bool:
+        return path in self.paths and self.ttl_for(path, params) > 0
+
+    def get(self, path: str, params: dict) -> typing.Union[Response, ImageResult, None]:
+        """
+        Get a cached result
+        :param path: API path
+        :param params: Query parameters
+        :return: Response, ImageResult or None
+        """
+        if not self.cacheable(path, params):
+            return None
+        key = make_key(path, params)
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._connection()
+                row = db.execute("SELECT kind, status, headers, data, used FROM entries WHERE key = ? AND expires > ?",
+                                 (key, now)).fetchone()
+            except sqlite3.OperationalError:
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if now - row[4] > self.ttl_for(path, params) * _TOUCH_AFTER:
+                try:
+                    db.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+                except sqlite3.OperationalError:
+                    # Recency is only a hint for eviction, a busy writer doesn't turn the hit into a miss
+                    pass
+        kind, status, headers, data, _ = row
+        if kind == _RESPONSE:
+            return Response(**json.loads(data))
+        return ImageResult(data, status, json.loads(headers))
+
+    def put(self, path: str, params: dict, value: typing.Any):
+        """
+        Store a result, unsuccessful API responses are never cached
+        :param path: API path
+        :param params: Query parameters
+        :param value: Response, ImageResult or raw bytes
+        """
+        if not self.cacheable(path, params):
+            return
+        if isinstance(value, Response):
+            if not value.success:
+                return
+            kind, status, headers, data = _RESPONSE, value.status, "{}", json.dumps(value._asdict()).encode()
+        elif isinstance(value, BaseImageResult):
+            kind, status, headers, data = _RAW, value.status, json.dumps(dict(value.headers)), value.tobytes()
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            kind, status, headers, data = _RAW, 200, "{}", bytes(value)
+        else:
+            return
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._connection()
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    db.execute(
+                        "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                        "kind = excluded.kind, status = excluded.status, headers = excluded.headers, "
+                        "data = excluded.data, size = excluded.size, expires = excluded.expires, used = excluded.used",
+                        (make_key(path, params), kind, status, headers, data, len(data),
+                         now + self.ttl_for(path, params), now)
+                    )
+                    self._evict(db, now)
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+            except sqlite3.OperationalError:
+                pass
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        if db.execute("SELECT bytes FROM total").fetchone()[0] <= self.max_bytes:
+            return
+        db.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+        while db.execute("SELECT bytes FROM total").fetchone()[0] > self.max_bytes:
+            db.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used LIMIT 16)")
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM entries")
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+            self._pid = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._connection()
+            size = db.execute("SELECT count(*) FROM entries").fetchone()[0]
+            total = db.execute("SELECT bytes FROM total").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": size,
+            "bytes": total,
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,122 @@
+import json
+import typing
+
+
+class TransportConfig(typing.NamedTuple):
+    """
+    Connection pool and timeout settings, applied to requests' HTTPAdapter in NekoBot and aiohttp's TCPConnector in
+    NekoBotAsync. None keeps the library's default.
+    pool_size: requests' pool_connections, how many per host pools are kept (default 10). aiohttp's limit, the total
+        connections open at once (default 100)
+    max_per_host: requests' pool_maxsize, connections kept open per host (default 10). aiohttp's limit_per_host,
+        connections open at once per host (default 0, no limit)
+    keepalive_timeout, dns_cache_ttl: Only supported by aiohttp
+    connect_timeout, read_timeout: Seconds per connection attempt and per socket read, aiohttp's total timeout of
+        300 seconds stays in place
+    """
+    pool_size: typing.Optional[int] = None
+    max_per_host: typing.Optional[int] = None
+    keepalive_timeout: float = 15.0
+    dns_cache_ttl: int = 10
+    connect_timeout: typing.Optional[float] = None
+    read_timeout: typing.Optional[float] = None
+
+
+class TransportResponse:
+    status: int = 200
+    reason: str = ""
+    headers: typing.Mapping[str, str] = {}
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+    def read(self) -> bytes:
+        raise NotImplementedError()
+
+    def iter_chunks(self, chunk_size: int) -> typing.Iterator[bytes]:
+        raise NotImplementedError()
+
+    def json(self) -> typing.Any:
+        return json.loads(self.read())
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> "TransportResponse":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Transport:
+    # Exceptions raised for connection problems, these are retried by the client's retry policy
+    errors: typing.Tuple[typing.Type[BaseException], ...] = (ConnectionError, TimeoutError)
+
+    def get(self, url: str, params: dict, headers: dict, *, stream: bool = False,
+            timeout: float = None) -> TransportResponse:
+        """
+        Send a GET request
+        :param url: Full URL
+        :param params: Query parameters
+        :param headers: Request headers
+        :param stream: Don't read the body before returning
+        :param timeout: Seconds left until the call's deadline, caps the configured timeouts
+        :return: Response, has to be closed by the caller
+        """
+        raise NotImplementedError()
+
+    def fork(self) -> "Transport":
+        """
+        :return: A transport that is safe to use from another thread, which can be this one
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class AsyncTransportResponse:
+    status: int = 200
+    reason: str = ""
+    headers: typing.Mapping[str, str] = {}
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+    async def read(self) -> bytes:
+        raise NotImplementedError()
+
+    def iter_chunks(self, chunk_size: int) -> typing.AsyncIterator[bytes]:
+        raise NotImplementedError()
+
+    async def json(self) -> typing.Any:
+        return json.loads(await self.read())
+
+    def release(self):
+        pass
+
+    async def __aenter__(self) -> "AsyncTransportResponse":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class AsyncTransport:
+    errors: typing.Tuple[typing.Type[BaseException], ...] = (ConnectionError, TimeoutError)
+
+    async def get(self, url: str, params: dict, headers: dict) -> AsyncTransportResponse:
+        """
+        Send a GET request, the body is not read before returning
+        :param url: Full URL
+        :param params: Query parameters
+        :param headers: Request headers
+        :return: Response, has to be released by the caller
+        """
+        raise NotImplementedError()
+
+    async def close(self):
+        pass